@@ -21,13 +21,24 @@ Enhanced with:
 
 import os
 import json
+import uuid
+import hashlib
+import pickle
 import random
+import shutil
+import signal
+import socket
+import sqlite3
+import tempfile
+import threading
 import traceback
 import time
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from dataclasses import dataclass, asdict
-from typing import Dict, List, Any, Optional
-from flask import Flask, request, jsonify, send_from_directory
+from typing import Callable, Dict, List, Any, Optional, Union
+from flask import Flask, Response, request, jsonify, send_from_directory, stream_with_context
 
 # ---------- LOGGING SETUP ----------
 import logging
@@ -48,16 +59,35 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+# Parse workers are forked from request threads. A child forked while another
+# thread is halfway through writing a log line inherits that stream's lock
+# taken and hangs on its first log call, so fork() waits for the handlers.
+def _lock_log_handlers() -> None:
+    for handler in logging.getLogger().handlers:
+        handler.acquire()
+
+
+def _unlock_log_handlers() -> None:
+    for handler in reversed(logging.getLogger().handlers):
+        handler.release()
+
+
+os.register_at_fork(before=_lock_log_handlers, after_in_parent=_unlock_log_handlers)
+
 logger.info("="*80)
 logger.info("TICKETER IMPROVED - Starting new session")
 logger.info("="*80)
 
 # ---------- PDF PARSING ----------
 try:
-    from pdfdata2 import extract as pdfdata2_extract
+    from pdfdata2 import extract as pdfdata2_extract, extract_many as pdfdata2_extract_many, ParseCache, TimingHistogram
     logger.info("✓ pdfdata2 module loaded successfully")
 except ImportError:
     pdfdata2_extract = None
+    pdfdata2_extract_many = None
+    ParseCache = None
+    TimingHistogram = None
     logger.warning("⚠ pdfdata2 module not found, using fallback parser")
 
 from PyPDF2 import PdfReader
@@ -65,9 +95,34 @@ from PyPDF2 import PdfReader
 PDF_UPLOAD_DIR = "uploads"
 os.makedirs(PDF_UPLOAD_DIR, exist_ok=True)
 
+# Uploads are parsed straight from memory; set KEEP_UPLOADS=true to also
+# write a copy to uploads/ (tickets themselves never read the file back)
+KEEP_UPLOADS = os.environ.get("KEEP_UPLOADS", "False").lower() == "true"
+
 SCREENSHOTS_DIR = "screenshots"
 os.makedirs(SCREENSHOTS_DIR, exist_ok=True)
 
+# Parsed results keyed by PDF content + parser version (re-uploads are instant)
+PARSE_CACHE_FILE = os.environ.get("PARSE_CACHE_FILE", os.path.join("cache", "parse_cache.sqlite3"))
+parse_cache = ParseCache(PARSE_CACHE_FILE) if ParseCache is not None else None
+
+# Worker processes used to parse an upload batch (pdfminer is CPU-bound)
+PARSE_WORKERS = int(os.environ.get("PARSE_WORKERS", os.cpu_count() or 1))
+
+# Parse workers are sandboxed: CPU seconds per file, MB a worker may allocate,
+# and files per worker before the pool is recycled (0 disables a limit)
+PARSE_CPU_LIMIT = int(os.environ.get("PARSE_CPU_LIMIT", 60))
+PARSE_MEMORY_LIMIT_MB = int(os.environ.get("PARSE_MEMORY_LIMIT_MB", 1024))
+PARSE_WORKER_MAX_FILES = int(os.environ.get("PARSE_WORKER_MAX_FILES", 50))
+
+# Parsed invoices per detected pdfdata2 template (reported by /health)
+template_counts: Counter = Counter()
+
+# PARSE_TIMINGS=true: per-stage parse timings are logged and aggregated into
+# histograms served at /parse_timings (off by default: tracemalloc is slow)
+PARSE_TIMINGS = os.environ.get("PARSE_TIMINGS", "False").lower() == "true"
+parse_timings = TimingHistogram() if TimingHistogram is not None else None
+
 
 def ensure_dot(value: Any) -> str:
     """Convert value to string, return '.' if empty"""
@@ -75,16 +130,22 @@ def ensure_dot(value: Any) -> str:
     return v if v else "."
 
 
-def parse_pdf(path: str) -> Dict[str, str]:
+def parse_pdf(pdf: Union[str, bytes], name: str = "") -> Dict[str, str]:
     """
     Uses pdfdata2.extract() to parse invoices.
+    `pdf` is a file path, the PDF bytes or a binary stream.
     Falls back to "." for missing fields.
     """
-    logger.info(f"Parsing PDF: {path}")
+    label = name or (pdf if isinstance(pdf, str) else "(in memory)")
+    logger.info(f"Parsing PDF: {label}")
     
     if pdfdata2_extract is not None:
         try:
-            raw = pdfdata2_extract(path)
+            if parse_cache is not None:
+                raw = parse_cache.extract(pdf, early_stop=True, timings=PARSE_TIMINGS)
+            else:
+                raw = pdfdata2_extract(pdf, early_stop=True, timings=PARSE_TIMINGS)
+            record_timings(label, raw)
             logger.debug(f"PDF parse result: {raw}")
         except Exception as e:
             logger.error(f"PDF parsing failed: {e}")
@@ -93,7 +154,70 @@ def parse_pdf(path: str) -> Dict[str, str]:
     else:
         raw = {}
 
-    result = {
+    result = normalize_fields(raw)
+    logger.info(f"✓ PDF parsed successfully: {result}")
+    return result
+
+
+def parse_pdfs(pdfs: Dict[str, bytes]):
+    """
+    Parse a batch of PDFs given as {name: pdf bytes}, yielding (name, fields, error)
+    as each file completes. Cache hits come back immediately; misses are
+    fanned out to PARSE_WORKERS sandboxed processes. A file that fails to parse
+    (including "parse timed out") yields "." fields and the error message.
+    """
+    logger.info(f"Parsing {len(pdfs)} PDFs with {PARSE_WORKERS} workers")
+
+    if pdfdata2_extract_many is None:
+        for name, data in pdfs.items():
+            yield name, parse_pdf(data, name), None
+        return
+
+    misses: Dict[str, bytes] = {}
+    keys: Dict[str, str] = {}
+    for name, data in pdfs.items():
+        raw = None
+        if parse_cache is not None:
+            keys[name] = parse_cache.key_for_pdf(data, early_stop=True)
+            raw = parse_cache.get(keys[name])
+        if raw is not None:
+            logger.info(f"✓ PDF served from parse cache: {name}")
+            yield name, normalize_fields(raw), None
+        else:
+            misses[name] = data
+
+    for name, raw, error in pdfdata2_extract_many(misses, workers=PARSE_WORKERS,
+                                                  cpu_seconds=PARSE_CPU_LIMIT or None,
+                                                  memory_mb=PARSE_MEMORY_LIMIT_MB or None,
+                                                  max_files_per_worker=PARSE_WORKER_MAX_FILES or None,
+                                                  early_stop=True, timings=PARSE_TIMINGS):
+        if error:
+            logger.error(f"PDF parsing failed for {name}: {error}")
+            raw = {}
+        else:
+            record_timings(name, raw)
+            logger.debug(f"PDF parse result for {name}: {raw}")
+            if name in keys:
+                parse_cache.put(keys[name], raw)
+        result = normalize_fields(raw)
+        logger.info(f"✓ PDF parsed: {name}: {result}")
+        yield name, result, error
+
+
+def record_timings(label: str, raw: Dict[str, Any]) -> None:
+    """Log and aggregate the "_timings" sidecar of a fresh parse (cache hits have none)"""
+    timings = raw.get("_timings")
+    if not timings or parse_timings is None:
+        return
+    parse_timings.record(timings)
+    stages = ", ".join(f"{k} {v['ms']:.0f}ms" for k, v in timings.items())
+    logger.info(f"⏱ Parse timings for {label}: {stages}")
+
+
+def normalize_fields(raw: Dict[str, Any]) -> Dict[str, str]:
+    """Map pdfdata2 output to the UI field names ("." for missing values) and count its template"""
+    template_counts[raw.get("template") or "failed"] += 1
+    return {
         "name": ensure_dot(raw.get("name")),
         "surname": ensure_dot(raw.get("surname")),
         "phone": ensure_dot(raw.get("phone")),
@@ -103,9 +227,6 @@ def parse_pdf(path: str) -> Dict[str, str]:
         "product": ensure_dot(raw.get("product")),
         "serial": ensure_dot(raw.get("serial")),
     }
-    
-    logger.info(f"✓ PDF parsed successfully: {result}")
-    return result
 
 
 # ---------- SELENIUM / PMM AUTOMATION ----------
@@ -210,11 +331,220 @@ NORMAL_RESOLUTION_OPTIONS = [
 class ParsedInvoice:
     id: str
     filename: str
-    path: str
+    path: str  # "" unless KEEP_UPLOADS is set
     fields: Dict[str, str]
 
 
-parsed_files: Dict[str, ParsedInvoice] = {}
+# Parsed invoices live in a SQLite store shared by every server process, scoped
+# to the parse session that uploaded them and dropped PARSED_TTL_SECONDS after
+# their last use. File IDs are content hashes, so re-uploads keep their ID.
+PARSED_STORE_FILE = os.environ.get("PARSED_STORE_FILE", os.path.join("cache", "parsed_invoices.sqlite3"))
+PARSED_TTL_SECONDS = int(os.environ.get("PARSED_TTL_SECONDS", 12 * 3600))
+
+
+def invoice_file_id(data: bytes) -> str:
+    """Content-hash ID of an uploaded PDF"""
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+class ParsedInvoiceStore:
+    """Session-scoped ParsedInvoice records in SQLite with TTL eviction (safe across processes)"""
+
+    def __init__(self, path: str, ttl: int = PARSED_TTL_SECONDS):
+        self.path = path
+        self.ttl = ttl
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.reopen()
+
+    def reopen(self) -> None:
+        """(Re)connect to the store file; needed in a forked child (see reopen_stores)"""
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS parsed_invoices ("
+            " session TEXT NOT NULL, id TEXT NOT NULL, filename TEXT NOT NULL, path TEXT NOT NULL,"
+            " fields TEXT NOT NULL, expires REAL NOT NULL, PRIMARY KEY (session, id))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS parsed_invoices_expires ON parsed_invoices (expires)")
+        self._db.commit()
+
+    def put(self, session_id: str, parsed: ParsedInvoice) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute("DELETE FROM parsed_invoices WHERE expires < ?", (now,))
+            self._db.execute(
+                "INSERT OR REPLACE INTO parsed_invoices (session, id, filename, path, fields, expires)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (session_id, parsed.id, parsed.filename, parsed.path,
+                 json.dumps(parsed.fields, ensure_ascii=False), now + self.ttl),
+            )
+            self._db.commit()
+
+    def get(self, session_id: str, file_id: str) -> Optional[ParsedInvoice]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT filename, path, fields FROM parsed_invoices WHERE session = ? AND id = ? AND expires >= ?",
+                (session_id, file_id, now),
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE parsed_invoices SET expires = ? WHERE session = ? AND id = ?",
+                (now + self.ttl, session_id, file_id),
+            )
+            self._db.commit()
+        return ParsedInvoice(id=file_id, filename=row[0], path=row[1], fields=json.loads(row[2]))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            invoices, sessions = self._db.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT session) FROM parsed_invoices WHERE expires >= ?", (time.time(),)
+            ).fetchone()
+        return {"invoices": invoices, "sessions": sessions, "ttl_seconds": self.ttl}
+
+
+parsed_store = ParsedInvoiceStore(PARSED_STORE_FILE)
+
+
+# ---------- JOB PROGRESS EVENTS ----------
+
+# Recent events per job, kept for /jobs/<id>/events (and reconnects)
+JOB_EVENT_HISTORY = 1000
+JOB_EVENT_JOBS = 50
+
+
+class JobEventBus:
+    """
+    In-memory progress events per job. publish() only appends under a short
+    lock and wakes readers, so a slow browser tab never holds up the
+    automation thread: readers catch up from the history by sequence number.
+    """
+
+    def __init__(self, history: int = JOB_EVENT_HISTORY, max_jobs: int = JOB_EVENT_JOBS):
+        self.history = history
+        self.max_jobs = max_jobs
+        self._cond = threading.Condition()
+        self._jobs: "OrderedDict[str, deque]" = OrderedDict()
+        self._seq = 0
+
+    def publish(self, job_id: str, event: Dict[str, Any]) -> None:
+        with self._cond:
+            self._seq += 1
+            events = self._jobs.get(job_id)
+            if events is None:
+                events = self._jobs[job_id] = deque(maxlen=self.history)
+                while len(self._jobs) > self.max_jobs:
+                    self._jobs.popitem(last=False)
+            events.append(dict(event, seq=self._seq, job_id=job_id, ts=time.time()))
+            self._cond.notify_all()
+
+    def since(self, job_id: str, after: int = 0, timeout: float = 0) -> List[Dict[str, Any]]:
+        """Events of job_id newer than seq `after`, waiting up to `timeout` seconds for the first one"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._newer(job_id, after), timeout)
+            return self._newer(job_id, after)
+
+    def _newer(self, job_id: str, after: int) -> List[Dict[str, Any]]:
+        return [e for e in self._jobs.get(job_id, ()) if e["seq"] > after]
+
+
+# serve.py runs ticket jobs and web requests in separate processes; with
+# SHARED_JOB_EVENTS=true (set by serve.py) events go through SQLite instead
+SHARED_JOB_EVENTS = os.environ.get("SHARED_JOB_EVENTS", "False").lower() == "true"
+JOB_EVENTS_DB_FILE = os.environ.get("JOB_EVENTS_DB_FILE", os.path.join("cache", "job_events.sqlite3"))
+JOB_EVENT_TTL_SECONDS = 24 * 3600
+JOB_EVENT_POLL_SECONDS = 0.25
+
+
+class SharedJobEventBus(JobEventBus):
+    """
+    JobEventBus over a SQLite file, for when the job runs in another process
+    than the request streaming it. publish() is a local insert, readers poll.
+    """
+
+    def __init__(self, path: str, history: int = JOB_EVENT_HISTORY):
+        self.path = path
+        self.history = history
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.reopen()
+
+    def reopen(self) -> None:
+        """(Re)connect to the events file; needed in a forked child (see reopen_stores)"""
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS job_events ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT, job_id TEXT NOT NULL, ts REAL NOT NULL, event TEXT NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS job_events_job ON job_events (job_id, seq)")
+        self._db.commit()
+
+    def publish(self, job_id: str, event: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            if event.get("type") == "job" and event.get("state") == "queued":
+                self._db.execute("DELETE FROM job_events WHERE ts < ?", (now - JOB_EVENT_TTL_SECONDS,))
+            self._db.execute(
+                "INSERT INTO job_events (job_id, ts, event) VALUES (?, ?, ?)",
+                (job_id, now, json.dumps(dict(event, job_id=job_id, ts=now), ensure_ascii=False)),
+            )
+            self._db.commit()
+
+    def since(self, job_id: str, after: int = 0, timeout: float = 0) -> List[Dict[str, Any]]:
+        deadline = time.time() + timeout
+        while True:
+            events = self._newer(job_id, after)
+            if events or time.time() >= deadline:
+                return events
+            time.sleep(JOB_EVENT_POLL_SECONDS)
+
+    def _newer(self, job_id: str, after: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT seq, event FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+                (job_id, after, self.history),
+            ).fetchall()
+        return [dict(json.loads(event), seq=seq) for seq, event in rows]
+
+
+job_events = SharedJobEventBus(JOB_EVENTS_DB_FILE) if SHARED_JOB_EVENTS else JobEventBus()
+
+
+class TicketProgress(threading.local):
+    """
+    The ticket the current job thread is working on. step() publishes a
+    finished section of create_single_ticket / a status change with the
+    time since the previous step; outside a job it does nothing.
+    """
+    job_id: Optional[str] = None
+    ticket: Optional[int] = None
+    mark: float = 0.0
+
+    def begin(self, job_id: str, ticket: int) -> None:
+        self.job_id, self.ticket, self.mark = job_id, ticket, time.time()
+
+    def end(self) -> None:
+        self.job_id = self.ticket = None
+
+    def step(self, step: str, state: str = "done", **data: Any) -> None:
+        if self.job_id is None:
+            return
+        now = time.time()
+        job_events.publish(self.job_id, dict(
+            data, type="step", ticket=self.ticket, step=step, state=state,
+            ms=round((now - self.mark) * 1000),
+        ))
+        self.mark = now
+
+
+ticket_progress = TicketProgress()
 
 
 def save_screenshot(driver: webdriver.Chrome, prefix: str) -> str:
@@ -807,6 +1137,7 @@ def progress_status_robust(driver: webdriver.Chrome, target_status: str,
                 wait_for_element(driver, By.ID, "ticketstatusID", timeout=10)
                 logger.info(f"✓ Status updated to '{status_to_select}' successfully")
                 logger.info("-"*60)
+                ticket_progress.step("status", status=status_to_select, attempts=attempt)
                 return True
                 
             except TimeoutException:
@@ -818,6 +1149,7 @@ def progress_status_robust(driver: webdriver.Chrome, target_status: str,
                     # Assume it worked
                     logger.info(f"✓ Status likely updated to '{status_to_select}' (continuing)")
                     logger.info("-"*60)
+                    ticket_progress.step("status", status=status_to_select, attempts=attempt, verified=False)
                     return True
         
         except NoSuchElementException as e:
@@ -843,6 +1175,7 @@ def progress_status_robust(driver: webdriver.Chrome, target_status: str,
     
     logger.error(f"✗ Failed to set status to '{target_status}' after {max_retries} attempts")
     logger.info("-"*60)
+    ticket_progress.step("status", "failed", status=status_to_select, attempts=max_retries)
     return False
 
 
@@ -997,6 +1330,7 @@ def create_single_ticket(driver: webdriver.Chrome,
         logger.info("✓ Category set")
     except Exception as e:
         logger.warning(f"Could not set category: {e}")
+    ticket_progress.step("store")
 
     # ========== ADD CUSTOMER ==========
     logger.info("Opening Add Customer modal...")
@@ -1100,7 +1434,9 @@ def create_single_ticket(driver: webdriver.Chrome,
         logger.error(f"✗ Failed filling customer modal: {e}")
         logger.debug(traceback.format_exc())
         save_screenshot(driver, "customer_fill_failed")
+        ticket_progress.step("customer", "failed", error=str(e))
         raise
+    ticket_progress.step("customer")
 
     # ========== DEVICE ==========
     logger.info("Setting device to 'Other/Generic'")
@@ -1225,6 +1561,7 @@ def create_single_ticket(driver: webdriver.Chrome,
     except Exception as e:
         logger.error(f"✗ Could not fill repair description: {e}")
         save_screenshot(driver, "repair_description_failed")
+    ticket_progress.step("device")
 
     # ========== SAVE TICKET ==========
     logger.info("Saving ticket...")
@@ -1254,7 +1591,9 @@ def create_single_ticket(driver: webdriver.Chrome,
     except:
         logger.error("✗ Did not reach Edit Ticket page")
         save_screenshot(driver, "edit_page_not_reached")
+        ticket_progress.step("save", "failed")
         raise
+    ticket_progress.step("save")
 
     # ========== UPDATE STATUS AND RESOLUTION ==========
     try:
@@ -1272,10 +1611,21 @@ def create_single_ticket(driver: webdriver.Chrome,
 
 def run_ticket_batch(crm_username: str,
                      crm_password: str,
-                     tickets_payload: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+                     tickets_payload: List[Dict[str, Any]],
+                     session_id: str,
+                     on_ticket: Optional[Callable[[int, Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
     """
-    Run a batch of tickets with comprehensive logging
+    Run a batch of tickets with comprehensive logging.
+    Ticket ids are looked up in the parse session `session_id`.
+    on_ticket(index, update) is called when a ticket starts and when it ends.
     """
+    def report(index: int, update: Dict[str, Any]) -> None:
+        if on_ticket is not None:
+            try:
+                on_ticket(index, update)
+            except Exception as e:
+                logger.error(f"Ticket progress callback failed: {e}")
+
     logger.info("")
     logger.info("="*80)
     logger.info(f"STARTING BATCH OF {len(tickets_payload)} TICKETS")
@@ -1298,17 +1648,19 @@ def run_ticket_batch(crm_username: str,
             logger.info(f"PROCESSING TICKET {idx}/{len(tickets_payload)}")
             logger.info("*"*80)
             
-            parsed = parsed_files.get(str(fid))
+            parsed = parsed_store.get(session_id, str(fid))
             if not parsed:
-                logger.error(f"✗ Parsed invoice not found for ID: {fid}")
+                logger.error(f"✗ Parsed invoice not found for ID: {fid} (session {session_id})")
                 results.append({
                     "id": fid,
                     "filename": "(unknown)",
                     "success": False,
-                    "error": "Parsed invoice not found in server memory."
+                    "error": "Parsed invoice not found (expired or from another session), please re-upload the PDF."
                 })
+                report(idx - 1, results[-1])
                 continue
 
+            report(idx - 1, {"filename": parsed.filename, "state": "running"})
             try:
                 create_single_ticket(driver, parsed, ticket_type, store)
                 results.append({
@@ -1317,6 +1669,7 @@ def run_ticket_batch(crm_username: str,
                     "success": True,
                     "error": ""
                 })
+                report(idx - 1, results[-1])
                 logger.info(f"✓✓✓ TICKET {idx}/{len(tickets_payload)} SUCCESS ✓✓✓")
                 
             except Exception as e:
@@ -1331,6 +1684,7 @@ def run_ticket_batch(crm_username: str,
                     "success": False,
                     "error": error_msg
                 })
+                report(idx - 1, results[-1])
                 
     finally:
         if driver is not None:
@@ -1351,6 +1705,378 @@ def run_ticket_batch(crm_username: str,
     return results
 
 
+# ---------- TICKET JOBS ----------
+
+# /create_tickets enqueues a job and returns at once; JOB_WORKERS batches run
+# at a time (each drives its own Chrome), at most JOB_QUEUE_LIMIT may wait.
+# Job records live in SQLite so finished results survive a restart.
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 1))
+JOB_QUEUE_LIMIT = int(os.environ.get("JOB_QUEUE_LIMIT", 20))
+JOBS_DB_FILE = os.environ.get("JOBS_DB_FILE", os.path.join("cache", "jobs.sqlite3"))
+
+JOB_ACTIVE_STATES = ("queued", "running")
+
+
+class JobStore:
+    """
+    SQLite-backed ticket jobs: {id, state, created, updated, error, tickets}.
+    Each ticket carries its own state (queued/running/done/failed) and result.
+    Credentials are never stored.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.reopen()
+
+    def reopen(self) -> None:
+        """(Re)connect to the jobs file; needed in a forked child (see reopen_stores)"""
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, state TEXT NOT NULL, created REAL NOT NULL,"
+            " updated REAL NOT NULL, error TEXT NOT NULL, tickets TEXT NOT NULL)"
+        )
+        self._db.commit()
+
+    def mark_interrupted(self, error: str = "server restarted") -> List[str]:
+        """
+        Jobs that were queued or running when the process running them stopped
+        are lost; returns their ids. Only whoever runs the jobs may call this
+        (at startup, or after the job runner died): any other importer would
+        clobber the live jobs of a running server.
+        """
+        with self._lock:
+            ids = [job_id for (job_id,) in self._db.execute(
+                "SELECT id FROM jobs WHERE state IN ('queued', 'running')")]
+            self._db.execute(
+                "UPDATE jobs SET state = 'interrupted', error = ?, updated = ?"
+                " WHERE state IN ('queued', 'running')", (error, time.time())
+            )
+            self._db.commit()
+        return ids
+
+    def create(self, tickets_payload: List[Dict[str, Any]], max_active: Optional[int] = None) -> Optional[str]:
+        """New queued job; None (nothing stored) if max_active jobs are already queued or running"""
+        job_id = uuid.uuid4().hex
+        tickets = [{
+            "id": t.get("id"),
+            "ticket_type": t.get("ticket_type"),
+            "store": t.get("store"),
+            "filename": "",
+            "state": "queued",
+            "success": None,
+            "error": "",
+        } for t in tickets_payload]
+        now = time.time()
+        with self._lock:
+            # count and insert under one write lock, or concurrent requests
+            # (from any web worker) could all see room in the queue
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                (active,) = self._db.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE state IN ('queued', 'running')"
+                ).fetchone()
+                if max_active is not None and active >= max_active:
+                    self._db.rollback()
+                    return None
+                self._db.execute(
+                    "INSERT INTO jobs (id, state, created, updated, error, tickets) VALUES (?, 'queued', ?, ?, '', ?)",
+                    (job_id, now, now, json.dumps(tickets, ensure_ascii=False)),
+                )
+                self._db.commit()
+            except BaseException:
+                self._db.rollback()
+                raise
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, state, created, updated, error, tickets FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(("id", "state", "created", "updated", "error"), row[:5]))
+        job["tickets"] = json.loads(row[5])
+        return job
+
+    def set_state(self, job_id: str, state: str, error: str = "") -> None:
+        with self._lock:
+            tickets = self._tickets(job_id)
+            if state not in JOB_ACTIVE_STATES:
+                # whatever never got to run shares the job's fate
+                for t in tickets:
+                    if t["state"] in JOB_ACTIVE_STATES:
+                        t.update(state="failed", success=False, error=error or "not run")
+            self._db.execute(
+                "UPDATE jobs SET state = ?, error = ?, updated = ?, tickets = ? WHERE id = ?",
+                (state, error, time.time(), json.dumps(tickets, ensure_ascii=False), job_id),
+            )
+            self._db.commit()
+
+    def update_ticket(self, job_id: str, index: int, update: Dict[str, Any]) -> None:
+        with self._lock:
+            tickets = self._tickets(job_id)
+            ticket = tickets[index]
+            ticket.update({k: v for k, v in update.items() if k != "id"})
+            if "success" in update:
+                ticket["state"] = "done" if update["success"] else "failed"
+            self._db.execute(
+                "UPDATE jobs SET updated = ?, tickets = ? WHERE id = ?",
+                (time.time(), json.dumps(tickets, ensure_ascii=False), job_id),
+            )
+            self._db.commit()
+
+    def _tickets(self, job_id: str) -> List[Dict[str, Any]]:
+        (tickets,) = self._db.execute("SELECT tickets FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(tickets)
+
+
+job_store = JobStore(JOBS_DB_FILE)
+job_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="ticket-job")
+
+
+def run_ticket_job(job_id: str, crm_username: str, crm_password: str,
+                   tickets_payload: List[Dict[str, Any]], session_id: str) -> None:
+    """Executor entry point: run the batch, recording per-ticket progress in the job store"""
+    logger.info(f"Job {job_id}: starting ({len(tickets_payload)} tickets)")
+    started = time.time()
+    ticket_started: Dict[int, float] = {}
+
+    def on_ticket(index: int, update: Dict[str, Any]) -> None:
+        job_store.update_ticket(job_id, index, update)
+        event = dict(update, type="ticket", ticket=index, id=tickets_payload[index].get("id"))
+        if update.get("state") == "running":
+            ticket_started[index] = time.time()
+            ticket_progress.begin(job_id, index)
+        else:
+            event["state"] = "done" if update.get("success") else "failed"
+            event["ms"] = round((time.time() - ticket_started.get(index, time.time())) * 1000)
+            ticket_progress.end()
+        job_events.publish(job_id, event)
+
+    job_store.set_state(job_id, "running")
+    job_events.publish(job_id, {"type": "job", "state": "running"})
+    try:
+        run_ticket_batch(crm_username, crm_password, tickets_payload, session_id, on_ticket=on_ticket)
+        state, error = "done", ""
+        logger.info(f"Job {job_id}: done")
+    except Exception as e:
+        logger.error(f"Job {job_id} failed: {e}")
+        logger.debug(traceback.format_exc())
+        state, error = "failed", str(e)
+    finally:
+        ticket_progress.end()
+    job_store.set_state(job_id, state, error)
+    job_events.publish(job_id, {"type": "job", "state": state, "error": error,
+                                "ms": round((time.time() - started) * 1000)})
+
+
+# Under serve.py the web workers only enqueue: jobs are handed over through a
+# Unix socket to one job runner process, which alone drives Chrome. Recycling a
+# web worker then never kills a running batch, and JOB_WORKERS holds globally.
+# Only the runner holds the listening socket, so a refused connection means it
+# is down; the server master checks on it and forks a new one if it died.
+JOB_RUNNER_CHECK_SECONDS = 2
+JOB_RUNNER_START_TIMEOUT = 10
+job_runner_socket: Optional[str] = None  # set by start_job_runner
+job_runner: Optional[int] = None  # pid, in the server master
+job_runner_supervisor: Optional[threading.Thread] = None
+job_runner_stopping = threading.Event()
+
+
+def submit_ticket_job(job_id: str, crm_username: str, crm_password: str,
+                      tickets_payload: List[Dict[str, Any]], session_id: str) -> None:
+    """Run the job in the job runner process if there is one, else on job_executor (OSError: runner down)"""
+    args = (job_id, crm_username, crm_password, tickets_payload, session_id)
+    if job_runner_socket is not None:
+        send_to_job_runner(args)
+    else:
+        job_executor.submit(run_ticket_job, *args)
+
+
+def send_to_job_runner(message: Any) -> None:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(JOB_RUNNER_START_TIMEOUT)
+        sock.connect(job_runner_socket)
+        sock.sendall(pickle.dumps(message))
+        sock.shutdown(socket.SHUT_WR)
+        if sock.recv(2) != b"ok":
+            raise ConnectionError("job runner did not take the job")
+
+
+def job_runner_alive() -> bool:
+    """True when the job runner accepts connections (or jobs run in-process)"""
+    if job_runner_socket is None:
+        return True
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(1)
+        try:
+            sock.connect(job_runner_socket)
+        except OSError:
+            return False
+    return True
+
+
+def receive_all(conn: socket.socket) -> bytes:
+    """Everything the peer sends until it shuts down its side"""
+    conn.settimeout(JOB_RUNNER_START_TIMEOUT)
+    chunks = []
+    while True:
+        chunk = conn.recv(65536)
+        if not chunk:
+            return b"".join(chunks)
+        chunks.append(chunk)
+
+
+def run_job_runner(listener: socket.socket) -> None:
+    """Job runner process: run jobs sent to `listener` on job_executor until None arrives"""
+    # signals to the whole process group (Ctrl+C) are for the server, which stops
+    # us; handlers inherited from gunicorn's master (on a restart) are not ours
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, signal.SIG_IGN)
+    for sig in (signal.SIGHUP, signal.SIGQUIT, signal.SIGUSR1, signal.SIGUSR2, signal.SIGCHLD,
+                signal.SIGTTIN, signal.SIGTTOU, signal.SIGWINCH):
+        signal.signal(sig, signal.SIG_DFL)
+    reopen_stores()
+    server = os.getppid()
+    listener.settimeout(1)
+    logger.info(f"Job runner started (pid {os.getpid()}, {JOB_WORKERS} workers)")
+    while True:
+        try:
+            conn, _ = listener.accept()
+        except socket.timeout:
+            if os.getppid() != server:
+                break  # the server died without stopping us
+            continue
+        with conn:
+            try:
+                data = receive_all(conn)
+                if not data:
+                    continue  # a job_runner_alive() probe
+                args = pickle.loads(data)
+                if args is not None:
+                    job_executor.submit(run_ticket_job, *args)
+                conn.sendall(b"ok")
+            except Exception as e:
+                logger.error(f"Job runner: dropped a message: {e}")
+                continue
+        if args is None:
+            break
+    listener.close()
+    job_executor.shutdown(wait=True)
+    logger.info("Job runner stopped")
+
+
+def fork_job_runner() -> int:
+    """Fork a job runner listening on job_runner_socket; returns its pid once it accepts jobs"""
+    if os.path.exists(job_runner_socket):
+        os.unlink(job_runner_socket)
+    pid = os.fork()
+    if pid == 0:
+        try:
+            # bound in the child, so no other process ever holds the listening socket
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            listener.bind(job_runner_socket)
+            listener.listen(64)
+            run_job_runner(listener)
+        finally:
+            os._exit(0)
+    deadline = time.time() + JOB_RUNNER_START_TIMEOUT
+    while not job_runner_alive() and time.time() < deadline:
+        time.sleep(0.05)
+    return pid
+
+
+def job_runner_exited(pid: int) -> bool:
+    try:
+        return os.waitpid(pid, os.WNOHANG) != (0, 0)
+    except ChildProcessError:
+        return True  # already reaped (gunicorn's master reaps every child)
+
+
+def supervise_job_runner() -> None:
+    """Server master thread: replace a job runner that died (OOM kill, crash)"""
+    global job_runner
+    while not job_runner_stopping.wait(JOB_RUNNER_CHECK_SECONDS):
+        if not job_runner_exited(job_runner):
+            continue
+        logger.error(f"Job runner (pid {job_runner}) died, starting a new one")
+        # its queued and running jobs died with it
+        for job_id in job_store.mark_interrupted("job runner died"):
+            job_events.publish(job_id, {"type": "job", "state": "interrupted", "error": "job runner died"})
+        if not job_runner_stopping.is_set():
+            job_runner = fork_job_runner()
+
+
+def start_job_runner() -> None:
+    """Start the job runner process and its supervisor (before the web workers fork)"""
+    global job_runner_socket, job_runner, job_runner_supervisor
+    job_store.mark_interrupted()
+    job_runner_socket = os.path.join(tempfile.mkdtemp(prefix="ticketer-jobs-"), "jobs.sock")
+    job_runner_stopping.clear()
+    job_runner = fork_job_runner()
+    job_runner_supervisor = threading.Thread(target=supervise_job_runner, name="job-runner-supervisor",
+                                             daemon=True)
+    job_runner_supervisor.start()
+
+
+def stop_job_runner(timeout: float) -> None:
+    """Let the job runner finish its running jobs for up to `timeout` seconds, then kill it"""
+    if job_runner is None:
+        return
+    job_runner_stopping.set()
+    job_runner_supervisor.join()
+    try:
+        send_to_job_runner(None)
+    except OSError:
+        pass  # already gone
+    deadline = time.time() + timeout
+    try:
+        while os.waitpid(job_runner, os.WNOHANG) == (0, 0):
+            if time.time() >= deadline:
+                logger.warning("Job runner did not stop in time, terminating it")
+                os.kill(job_runner, signal.SIGKILL)
+                os.waitpid(job_runner, 0)
+                break
+            time.sleep(0.1)
+    except ChildProcessError:
+        pass  # already reaped (gunicorn's master reaps every child)
+    shutil.rmtree(os.path.dirname(job_runner_socket), ignore_errors=True)
+
+
+def reopen_stores() -> None:
+    """Call in a forked server process: SQLite connections must not be shared across fork()"""
+    if parse_cache is not None:
+        parse_cache.reopen()
+    parsed_store.reopen()
+    job_store.reopen()
+    if isinstance(job_events, SharedJobEventBus):
+        job_events.reopen()
+
+
+def job_summary(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Job record plus counters and, once finished, the /create_tickets-style results list"""
+    tickets = job["tickets"]
+    out = dict(job)
+    out["total"] = len(tickets)
+    out["succeeded"] = sum(1 for t in tickets if t["state"] == "done")
+    out["failed"] = sum(1 for t in tickets if t["state"] == "failed")
+    if job["state"] not in JOB_ACTIVE_STATES:
+        out["results"] = [{
+            "id": t["id"],
+            "filename": t["filename"] or "(unknown)",
+            "success": bool(t["success"]),
+            "error": t["error"],
+        } for t in tickets]
+    return out
+
+
 # ========== FLASK API ==========
 
 app = Flask(__name__)
@@ -1358,30 +2084,69 @@ app = Flask(__name__)
 
 @app.route("/parse_pdfs", methods=["POST"])
 def api_parse_pdfs():
-    """Parse uploaded PDFs"""
-    global parsed_files
-    parsed_files = {}
+    """
+    Parse uploaded PDFs.
+    Files join the parse session given as the "session_id" form field, or a
+    new one; its ID is returned as "session_id" and the X-Session-ID header.
+    With ?stream=1 (or Accept: application/x-ndjson) the response is NDJSON:
+    one {"id", "filename", "fields"[, "error"]} line per file as soon as it is
+    parsed (completion order), then a {"summary": {...}} line.
+    """
+    session_id = (request.form.get("session_id") or "").strip() or uuid.uuid4().hex
 
     logger.info("="*60)
     logger.info("API: /parse_pdfs called")
     logger.info("="*60)
 
     files = request.files.getlist("pdfs")
-    logger.info(f"Received {len(files)} files")
+    logger.info(f"Received {len(files)} files (session {session_id})")
     
-    out: List[Dict[str, Any]] = []
+    uploads = []
+    seen = set()
 
-    for idx, f in enumerate(files):
+    for f in files:
         if not f.filename.lower().endswith(".pdf"):
             logger.warning(f"Skipping non-PDF file: {f.filename}")
             continue
             
         safe_name = f.filename
-        path = os.path.join(PDF_UPLOAD_DIR, safe_name)
-        f.save(path)
-        logger.info(f"Saved: {path}")
+        data = f.read()
+        file_id = invoice_file_id(data)
+        if file_id in seen:
+            logger.warning(f"Skipping duplicate upload: {safe_name}")
+            continue
+        seen.add(file_id)
+        path = ""
+        if KEEP_UPLOADS:
+            path = os.path.join(PDF_UPLOAD_DIR, safe_name)
+            with open(path, "wb") as fh:
+                fh.write(data)
+            logger.info(f"Saved: {path}")
+        uploads.append((file_id, safe_name, path, data))
+
+    stream = request.args.get("stream", "").lower() in ("1", "true") or \
+        "application/x-ndjson" in request.headers.get("Accept", "")
+    if stream:
+        return Response(parse_uploads_ndjson(session_id, uploads), mimetype="application/x-ndjson",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no",
+                                 "X-Session-ID": session_id})
+
+    parsed_by_id = {item["id"]: item for item in parse_uploads(session_id, uploads)}
+    out = [parsed_by_id[file_id] for file_id, _, _, _ in uploads]
+    logger.info(f"Successfully parsed {len(out)} PDFs")
+    response = jsonify({"session_id": session_id, "files": out})
+    response.headers["X-Session-ID"] = session_id
+    return response
+
 
-        fields = parse_pdf(path)
+def parse_uploads(session_id: str, uploads: List[tuple]):
+    """
+    Parse (file_id, filename, path, data) uploads concurrently, storing each in
+    the parse session and yielding its /parse_pdfs item as soon as it is ready.
+    """
+    names = {file_id: (safe_name, path) for file_id, safe_name, path, _ in uploads}
+    for file_id, fields, error in parse_pdfs({file_id: data for file_id, _, _, data in uploads}):
+        safe_name, path = names[file_id]
         
         normalized = {
             "name": ensure_dot(fields.get("name")),
@@ -1394,22 +2159,42 @@ def api_parse_pdfs():
             "serial": ensure_dot(fields.get("serial")),
         }
 
-        file_id = str(idx + 1)
         parsed = ParsedInvoice(
             id=file_id,
             filename=safe_name,
             path=path,
             fields=normalized,
         )
-        parsed_files[file_id] = parsed
-        out.append({
+        parsed_store.put(session_id, parsed)
+        item = {
             "id": file_id,
             "filename": safe_name,
             "fields": normalized,
-        })
-
-    logger.info(f"Successfully parsed {len(out)} PDFs")
-    return jsonify({"files": out})
+        }
+        if error:
+            item["error"] = error
+        yield item
+
+
+def parse_uploads_ndjson(session_id: str, uploads: List[tuple]):
+    """NDJSON body for a streamed /parse_pdfs: one line per parsed file, then a summary line"""
+    started = time.time()
+    first = None
+    failed = 0
+    for item in parse_uploads(session_id, uploads):
+        if first is None:
+            first = time.time() - started
+        failed += "error" in item
+        yield json.dumps(item, ensure_ascii=False) + "\n"
+    summary = {
+        "session_id": session_id,
+        "files": len(uploads),
+        "failed": failed,
+        "seconds": round(time.time() - started, 3),
+        "first_result_seconds": round(first, 3) if first is not None else None,
+    }
+    logger.info(f"Streamed {len(uploads)} parsed PDFs: {summary}")
+    yield json.dumps({"summary": summary}) + "\n"
 
 
 @app.route("/create_tickets", methods=["POST"])
@@ -1422,6 +2207,7 @@ def api_create_tickets():
     data = request.get_json(force=True)
     crm_username = data.get("crm_username", "").strip()
     crm_password = data.get("crm_password", "").strip()
+    session_id = (data.get("session_id") or "").strip()
     tickets_payload = data.get("tickets", [])
 
     logger.info(f"Username: {crm_username}")
@@ -1431,22 +2217,118 @@ def api_create_tickets():
         logger.error("Missing CRM credentials")
         return jsonify({"error": "Missing CRM credentials"}), 400
 
+    if not session_id:
+        logger.error("Missing parse session")
+        return jsonify({"error": "Missing session_id (upload the PDFs first)"}), 400
+
+    if not job_runner_alive():
+        logger.error("Ticket job runner is down")
+        return jsonify({"error": "Ticket job runner is down, try again in a moment"}), 503
+
     try:
-        results = run_ticket_batch(crm_username, crm_password, tickets_payload)
-        return jsonify({"results": results})
+        job_id = job_store.create(tickets_payload, max_active=JOB_QUEUE_LIMIT)
+        if job_id is None:
+            logger.error("Ticket job queue is full")
+            return jsonify({"error": "Too many ticket jobs queued, try again later"}), 503
+        job_events.publish(job_id, {"type": "job", "state": "queued"})
+        try:
+            submit_ticket_job(job_id, crm_username, crm_password, tickets_payload, session_id)
+        except OSError as e:
+            logger.error(f"Job {job_id}: job runner unavailable: {e}")
+            job_store.set_state(job_id, "failed", "job runner unavailable")
+            job_events.publish(job_id, {"type": "job", "state": "failed", "error": "job runner unavailable"})
+            return jsonify({"error": "Ticket job runner is down, try again in a moment"}), 503
     except Exception as e:
         logger.error(f"API error: {e}")
         logger.debug(traceback.format_exc())
         return jsonify({"error": str(e)}), 500
 
+    logger.info(f"Queued job {job_id}")
+    return jsonify({"job_id": job_id, "state": "queued", "status_url": f"/jobs/{job_id}",
+                    "events_url": f"/jobs/{job_id}/events"}), 202
+
+
+@app.route("/jobs/<job_id>")
+def api_job(job_id):
+    """State and per-ticket results of a /create_tickets job"""
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job_summary(job))
+
+
+# Seconds between SSE keep-alive comments (proxies drop idle connections)
+SSE_KEEPALIVE = 15
+
+# Each open event stream holds a server thread for the whole job; at most
+# SSE_MAX_STREAMS per process (0: no limit, serve.py sets half its threads) so
+# /parse_pdfs and /health always have threads left. Refused clients poll instead.
+SSE_MAX_STREAMS = int(os.environ.get("SSE_MAX_STREAMS", 0))
+sse_slots = threading.BoundedSemaphore(SSE_MAX_STREAMS) if SSE_MAX_STREAMS > 0 else None
+
+
+@app.route("/jobs/<job_id>/events")
+def api_job_events(job_id):
+    """Server-Sent Events: job, ticket and step progress of a /create_tickets job"""
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    try:
+        after = int(request.headers.get("Last-Event-ID") or request.args.get("after") or 0)
+    except ValueError:
+        after = 0
+
+    def sse(event: Dict[str, Any]) -> str:
+        return f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+    if sse_slots is not None and not sse_slots.acquire(blocking=False):
+        return jsonify({"error": f"Too many event streams, poll /jobs/{job_id}"}), 503
+
+    def stream():
+        last = after
+        if job["state"] not in JOB_ACTIVE_STATES and not job_events.since(job_id, last):
+            # finished before this server process started: only the final state is left
+            yield sse({"seq": last, "type": "job", "job_id": job_id, "state": job["state"], "error": job["error"]})
+            return
+        while True:
+            events = job_events.since(job_id, last, timeout=SSE_KEEPALIVE)
+            if not events:
+                yield ": keep-alive\n\n"
+                continue
+            for event in events:
+                last = event["seq"]
+                yield sse(event)
+                if event["type"] == "job" and event["state"] not in JOB_ACTIVE_STATES:
+                    return
+
+    response = Response(stream_with_context(stream()), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    if sse_slots is not None:
+        response.call_on_close(sse_slots.release)
+    return response
+
 
 @app.route("/health")
 def health():
     """Health check endpoint for Railway/Render"""
+    runner_up = job_runner_alive()
     return jsonify({
-        "status": "healthy",
+        "status": "healthy" if runner_up else "degraded",
+        "job_runner": "in-process" if job_runner_socket is None else "running" if runner_up else "down",
         "version": "2.0",
-        "timestamp": datetime.now().isoformat()
+        "timestamp": datetime.now().isoformat(),
+        "parse_cache": parse_cache.stats() if parse_cache is not None else None,
+        "parsed_invoices": parsed_store.stats(),
+        "templates": dict(template_counts),
+    })
+
+
+@app.route("/parse_timings")
+def api_parse_timings():
+    """Per-stage parse time histograms (collected when PARSE_TIMINGS=true)"""
+    return jsonify({
+        "enabled": PARSE_TIMINGS,
+        "stages": parse_timings.snapshot() if parse_timings is not None else {},
     })
 
 
@@ -1486,6 +2368,9 @@ if __name__ == "__main__":
     host = os.environ.get("HOST", "0.0.0.0")
     debug = os.environ.get("DEBUG", "False").lower() == "true"
     
+    # this process runs the jobs: whatever a previous run left queued is lost
+    job_store.mark_interrupted()
+
     print(f"🌐 BINDING TO: {host}:{port} (debug={debug})")
     logger.info(f"🌐 Starting server on {host}:{port} (debug={debug})")
     
@@ -36,10 +36,11 @@ logger.info("="*80)
 
 # ---------- PDF PARSING ----------
 try:
-    from pdfdata2 import extract as pdfdata2_extract
+    from pdfdata2 import extract as pdfdata2_extract, ParseCache
     logger.info("✓ pdfdata2 module loaded")
 except ImportError:
     pdfdata2_extract = None
+    ParseCache = None
     logger.warning("⚠ pdfdata2 module not found")
 
 from PyPDF2 import PdfReader
@@ -50,6 +51,10 @@ os.makedirs(PDF_UPLOAD_DIR, exist_ok=True)
 SCREENSHOTS_DIR = "screenshots"
 os.makedirs(SCREENSHOTS_DIR, exist_ok=True)
 
+# Parsed results keyed by PDF content + parser version (re-uploads are instant)
+PARSE_CACHE_FILE = os.environ.get("PARSE_CACHE_FILE", os.path.join("cache", "parse_cache.sqlite3"))
+parse_cache = ParseCache(PARSE_CACHE_FILE) if ParseCache is not None else None
+
 
 def ensure_dot(value: Any) -> str:
     v = ("" if value is None else str(value)).strip()
@@ -61,7 +66,10 @@ def parse_pdf(path: str) -> Dict[str, str]:
     
     if pdfdata2_extract is not None:
         try:
-            raw = pdfdata2_extract(path)
+            if parse_cache is not None:
+                raw = parse_cache.extract(path, early_stop=True)
+            else:
+                raw = pdfdata2_extract(path, early_stop=True)
             logger.debug(f"PDF parse result: {raw}")
         except Exception as e:
             logger.error(f"PDF parsing failed: {e}")
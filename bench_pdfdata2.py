@@ -0,0 +1,263 @@
+# bench_pdfdata2.py
+# Speed and accuracy benchmark for pdfdata2 over a corpus written by
+# invoice_corpus.py (PDF + ground-truth JSON pairs).
+#
+#   python invoice_corpus.py corpus/ --count 200
+#   python bench_pdfdata2.py corpus/ --save-baseline   # once, before a change
+#   python bench_pdfdata2.py corpus/                   # after it: compare
+#   python bench_pdfdata2.py corpus/ --memory          # + peak RSS vs page count
+
+import os, sys, glob, json, time, pstats, resource, cProfile, argparse, tempfile, subprocess
+
+import pdfdata2
+
+BASELINE_FILE = "bench_baseline.json"
+MAX_SLOWDOWN = 0.10        # files/sec may drop by 10% before it counts as a regression
+MAX_ACCURACY_DROP = 0.0    # any per-field accuracy drop is a regression
+TOP_FUNCTIONS = 15
+MEMORY_PAGE_COUNTS = (10, 20, 40, 80)
+MAX_MEMORY_GROWTH = 0.25   # peak RSS of the longest statement may exceed the shortest's by 25%
+
+
+def load_corpus(corpus_dir):
+    """[(pdf_path, expected_fields)] for every PDF that has a .json next to it."""
+    cases = []
+    for pdf in sorted(glob.glob(os.path.join(corpus_dir, "*.pdf"))):
+        truth = os.path.splitext(pdf)[0] + ".json"
+        if os.path.exists(truth):
+            with open(truth, encoding="utf-8") as f:
+                cases.append((pdf, json.load(f)))
+    return cases
+
+
+def time_corpus(cases, backend=None, repeat=1):
+    """Parse every file `repeat` times; returns (best_seconds, results of the first pass)."""
+    best, results = None, None
+    for _ in range(repeat):
+        run = []
+        t0 = time.perf_counter()
+        for pdf, _ in cases:
+            try:
+                run.append(pdfdata2.extract(pdf, backend=backend))
+            except Exception as e:
+                run.append({"error": f"{type(e).__name__}: {e}"})
+        seconds = time.perf_counter() - t0
+        best = seconds if best is None else min(best, seconds)
+        results = results or run
+    return best, results
+
+
+def profile_corpus(cases, backend=None, top=TOP_FUNCTIONS):
+    """Cumulative time per pdfdata2 function over one pass, in ms per file."""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    for pdf, _ in cases:
+        try:
+            pdfdata2.extract(pdf, backend=backend)
+        except Exception:
+            pass
+    profiler.disable()
+
+    source = os.path.abspath(pdfdata2.__file__)
+    rows = []
+    for (filename, _, func), (_, calls, _, cumtime, _) in pstats.Stats(profiler).stats.items():
+        if os.path.abspath(filename) == source:
+            rows.append((func, calls, cumtime))
+    rows.sort(key=lambda r: -r[2])
+    n = max(len(cases), 1)
+    return {func: {"calls": calls, "ms_per_file": round(cumtime / n * 1000, 3)} for func, calls, cumtime in rows[:top]}
+
+
+def accuracy(cases, results):
+    """Exact-match rate per expected field, plus "all_fields" for fully correct files."""
+    fields = sorted({k for _, expected in cases for k in expected})
+    hits = dict.fromkeys(fields, 0)
+    perfect = 0
+    for (_, expected), got in zip(cases, results):
+        ok = True
+        for k, v in expected.items():
+            if got.get(k) == v:
+                hits[k] += 1
+            else:
+                ok = False
+        perfect += ok
+    n = max(len(cases), 1)
+    out = {k: round(hits[k] / n, 4) for k in fields}
+    out["all_fields"] = round(perfect / n, 4)
+    return out
+
+
+def run_benchmark(corpus_dir, backend=None, repeat=1, profile=True, memory=False):
+    cases = load_corpus(corpus_dir)
+    if not cases:
+        raise SystemExit(f"No PDF + JSON pairs in {corpus_dir} (generate them with invoice_corpus.py)")
+    seconds, results = time_corpus(cases, backend, repeat)
+    report = {
+        "backend": pdfdata2.get_backend(backend).name,
+        "files": len(cases),
+        "seconds": round(seconds, 3),
+        "files_per_sec": round(len(cases) / seconds, 2) if seconds else None,
+        "errors": sum(1 for r in results if "error" in r),
+        "accuracy": accuracy(cases, results),
+    }
+    if profile:
+        report["functions"] = profile_corpus(cases, backend)
+    if memory:
+        report["memory"] = memory_profile(cases, backend)
+    return report
+
+
+def build_statement(cases, pages, out_path):
+    """Concatenate corpus invoices into one `pages`-page PDF (a long statement)."""
+    import fitz
+    statement = fitz.open()
+    i = 0
+    while len(statement) < pages:
+        with fitz.open(cases[i % len(cases)][0]) as invoice:
+            statement.insert_pdf(invoice, to_page=pages - len(statement) - 1)
+        i += 1
+    statement.save(out_path)
+    statement.close()
+
+
+def _rss_kb(field):
+    """VmRSS / VmHWM (current / peak resident KB) from /proc, or None off Linux."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def probe_memory(pdf_path, backend=None):
+    """Run in a fresh process: peak RSS growth (KB) while get_lines() reads every page."""
+    backend = pdfdata2.warm_backend(backend)
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")  # reset VmHWM, so imports don't count towards the peak
+    except OSError:
+        pass
+    before = _rss_kb("VmRSS") or resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+    lines = sum(1 for _ in pdfdata2.get_lines(pdf_path, backend))
+    peak = _rss_kb("VmHWM") or resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "lines": lines,
+        "seconds": round(time.perf_counter() - t0, 3),
+        "peak_rss_kb": max(0, peak - before),
+    }
+
+
+def memory_profile(cases, backend=None, page_counts=MEMORY_PAGE_COUNTS):
+    """{pages: probe_memory()} for statements of each length, each parsed in its own process."""
+    out = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in page_counts:
+            path = os.path.join(tmp, f"statement_{pages}.pdf")
+            build_statement(cases, pages, path)
+            cmd = [sys.executable, os.path.abspath(__file__), "--memory-probe", path]
+            if backend:
+                cmd += ["--backend", backend]
+            proc = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            out[str(pages)] = json.loads(proc.stdout.strip().splitlines()[-1])
+    return out
+
+
+def check_memory(memory, max_growth=MAX_MEMORY_GROWTH):
+    """Regressions when peak RSS grows with page count (empty list: flat)."""
+    rows = sorted(memory.items(), key=lambda kv: int(kv[0]))
+    if len(rows) < 2:
+        return []
+    (few, first), (many, last) = rows[0], rows[-1]
+    if last["peak_rss_kb"] > first["peak_rss_kb"] * (1 + max_growth):
+        return [f"peak RSS {last['peak_rss_kb']} KB at {many} pages vs {first['peak_rss_kb']} KB at {few} "
+                f"(more than +{max_growth:.0%})"]
+    return []
+
+
+def compare(report, baseline, max_slowdown=MAX_SLOWDOWN, max_accuracy_drop=MAX_ACCURACY_DROP):
+    """Human-readable regressions of `report` against `baseline` (empty list: none)."""
+    problems = []
+    if baseline.get("files") != report["files"] or baseline.get("backend") != report["backend"]:
+        problems.append(f"baseline was {baseline.get('files')} files on {baseline.get('backend')}, "
+                        f"now {report['files']} on {report['backend']}: not comparable")
+        return problems
+    old, new = baseline.get("files_per_sec"), report["files_per_sec"]
+    if old and new and new < old * (1 - max_slowdown):
+        problems.append(f"throughput {new:.2f} files/s vs {old:.2f} baseline ({(new / old - 1) * 100:+.1f}%)")
+    for field, old_acc in baseline.get("accuracy", {}).items():
+        new_acc = report["accuracy"].get(field, 0.0)
+        if new_acc < old_acc - max_accuracy_drop:
+            problems.append(f"accuracy[{field}] {new_acc:.2%} vs {old_acc:.2%} baseline")
+    return problems
+
+
+def print_report(report, baseline=None):
+    print(f"{report['files']} files, backend {report['backend']}: {report['seconds']:.2f}s, "
+          f"{report['files_per_sec']} files/s, {report['errors']} errors")
+    base_acc = (baseline or {}).get("accuracy", {})
+    print("accuracy:")
+    for field, acc in report["accuracy"].items():
+        delta = f"  ({(acc - base_acc[field]) * 100:+.1f} pts)" if field in base_acc else ""
+        print(f"  {field:<12} {acc:7.2%}{delta}")
+    if report.get("functions"):
+        base_fn = (baseline or {}).get("functions", {})
+        print("time per file (cumulative, profiled):")
+        for func, row in report["functions"].items():
+            old = base_fn.get(func, {}).get("ms_per_file")
+            delta = f"  (baseline {old:.2f})" if old is not None else ""
+            print(f"  {func:<32} {row['ms_per_file']:9.2f} ms  {row['calls']:>7} calls{delta}")
+    if report.get("memory"):
+        print("peak RSS growth while reading a long statement (fresh process each):")
+        for pages, row in report["memory"].items():
+            print(f"  {pages:>4} pages  {row['peak_rss_kb'] / 1024:8.1f} MB  {row['lines']:>6} lines  {row['seconds']:7.2f}s")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmark pdfdata2 speed and accuracy on a synthetic corpus.")
+    ap.add_argument("corpus", nargs="?", default="corpus", help="directory from invoice_corpus.py (default: corpus)")
+    ap.add_argument("--backend", choices=sorted(pdfdata2.BACKENDS), help="text extraction backend")
+    ap.add_argument("--repeat", type=int, default=1, help="timed passes; the fastest counts (default: 1)")
+    ap.add_argument("--no-profile", action="store_true", help="skip the per-function cProfile pass")
+    ap.add_argument("--baseline", default=BASELINE_FILE, help=f"baseline JSON (default: {BASELINE_FILE})")
+    ap.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    ap.add_argument("--max-slowdown", type=float, default=MAX_SLOWDOWN,
+                    help=f"allowed files/sec drop as a fraction (default: {MAX_SLOWDOWN})")
+    ap.add_argument("--memory", action="store_true",
+                    help=f"also check that peak RSS stays flat for {'/'.join(map(str, MEMORY_PAGE_COUNTS))}-page statements")
+    ap.add_argument("--json", action="store_true", help="print the report as JSON")
+    ap.add_argument("--memory-probe", metavar="PDF", help=argparse.SUPPRESS)  # child of --memory
+    args = ap.parse_args()
+
+    if args.memory_probe:
+        print(json.dumps(probe_memory(args.memory_probe, args.backend)))
+        sys.exit(0)
+
+    report = run_benchmark(args.corpus, backend=args.backend, repeat=args.repeat, profile=not args.no_profile,
+                           memory=args.memory)
+    memory_problems = check_memory(report["memory"]) if args.memory else []
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report, baseline)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"baseline saved to {args.baseline}", file=sys.stderr)
+
+    problems = list(memory_problems)
+    if baseline is not None:
+        problems += compare(report, baseline, max_slowdown=args.max_slowdown)
+    for p in problems:
+        print(f"REGRESSION: {p}", file=sys.stderr)
+    sys.exit(1 if problems else 0)
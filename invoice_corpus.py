@@ -0,0 +1,288 @@
+# invoice_corpus.py
+# Synthetic invoice corpus for pdfdata2: old ("Στοιχεία Πελάτη") and new
+# ("ΕΠΩΝΥΜΙΑ:") layout PDFs drawn with PyMuPDF, each written next to a
+# <name>.json holding the fields pdfdata2.extract() should return.
+#
+#   python invoice_corpus.py corpus/ --count 200 --seed 1
+
+import os, sys, json, random, argparse
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+PAGE_W, PAGE_H = 595, 842          # A4 in points
+TOP, BOTTOM, LEFT = 50, 780, 40
+ROW = 14                           # table row pitch
+FONT_SIZE = 9
+
+COMPANIES = ["PUBLIC ELECTRONICS LTD", "STEPHANIS TRADING LTD", "ELECTROLINE CYPRUS LTD"]
+CITIES = ["ΛΕΥΚΩΣΙΑ", "ΛΕΜΕΣΟΣ", "ΛΑΡΝΑΚΑ", "ΠΑΦΟΣ", "ΑΜΜΟΧΩΣΤΟΣ"]
+STREETS = ["Μακαρίου", "Αρχ. Κυπριανού", "Γρίβα Διγενή", "Λεωφ. Ευαγόρου", "Στασικράτους"]
+SURNAMES = ["ΠΑΠΑΔΟΠΟΥΛΟΣ", "ΓΕΩΡΓΙΟΥ", "ΚΩΝΣΤΑΝΤΙΝΟΥ", "CHATZIGIANNIS", "IOANNOU",
+            "CHRISTODOULOU", "VILLA CORONEL", "NICOLAOU", "ΑΝΤΩΝΙΟΥ", "PETROU"]
+FIRST_NAMES = ["ΓΙΩΡΓΟΣ", "ΜΑΡΙΑ", "ΕΛΕΝΗ", "ΑΝΔΡΕΑΣ", "KWNSTANTINOS", "ALEJANDRO",
+               "MICHALIS", "ANNA", "ΧΡΙΣΤΙΝΑ", "NIKOS"]
+
+# description, (min, max) gross price, carries a serial number
+DEVICES = [
+    ("APPLE IPHONE 15 128GB BLACK", (799, 1099), True),
+    ("APPLE IPHONE 16 PRO 256GB", (1199, 1499), True),
+    ("SAMSUNG GALAXY A55 PHONE 128GB", (349, 479), True),
+    ("SAMSUNG GALAXY S24 PHONE 256GB", (849, 1049), True),
+    ("APPLE MACBOOK AIR 13 M2 256GB", (999, 1399), True),
+    ("APPLE IPAD 10.9 WIFI 64GB", (399, 549), True),
+    ("JBL CHARGE 5 PORTABLE SPEAKER", (139, 189), True),
+    ("JBL FLIP 6 PORTABLE SPEAKER", (99, 139), True),
+]
+ACCESSORIES = [
+    ("APPLE USB-C CHARGER 20W", (19, 29), False),
+    ("APPLE USB-C TO LIGHTNING CABLE 1M", (19, 25), False),
+    ("SAMSUNG SILICONE CASE", (15, 35), False),
+    ("APPLE EARPODS USB-C", (19, 25), False),
+    ("HANDSFREE BLUETOOTH JBL TUNE", (29, 59), False),
+    ("USB CAR CHARGER 2 PORT", (10, 19), False),
+]
+
+
+def money(value, rng):
+    """Greek ("1.234,56") or plain ("1234.56") price formatting, as both appear."""
+    if rng.random() < 0.75:
+        return f"{value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+    return f"{value:.2f}"
+
+
+def random_phone(rng):
+    """Cyprus 8-digit number: mobile (9x) or landline (2x)."""
+    return rng.choice(["99", "97", "96", "95", "22", "25", "24"]) + "".join(rng.choice("0123456789") for _ in range(6))
+
+
+def random_cst(rng):
+    kind = rng.random()
+    if kind < 0.25:
+        return ""
+    if kind < 0.5:
+        return rng.choice("PAKLM") + str(rng.randint(1, 9))
+    if kind < 0.75:
+        return "".join(rng.choice("0123456789") for _ in range(10))
+    return "CΒ" + "".join(rng.choice("0123456789") for _ in range(8))
+
+
+def random_items(rng):
+    """One optional device plus accessories; occasionally a long multi-page list."""
+    n_acc = rng.choice([0, 0, 1, 1, 2, 3]) if rng.random() < 0.9 else rng.randint(20, 60)
+    picks = []
+    if rng.random() < 0.85:
+        picks.append(rng.choice(DEVICES))
+    picks += [rng.choice(ACCESSORIES) for _ in range(n_acc)]
+    if not picks:
+        picks.append(rng.choice(ACCESSORIES))
+    rng.shuffle(picks)
+
+    items, skus = [], set()
+    for desc, (lo, hi), has_serial in picks:
+        sku = str(rng.randint(1000000, 9999999))
+        while sku in skus:
+            sku = str(rng.randint(1000000, 9999999))
+        skus.add(sku)
+        qty = 1 if has_serial or rng.random() < 0.8 else 2
+        unit = round(rng.uniform(lo, hi), 0) - rng.choice([0.01, 0.1, 0.0])
+        items.append({
+            "sku": sku,
+            "desc": desc,
+            "qty": qty,
+            "unit": round(unit, 2),
+            "gross": round(unit * qty, 2),
+            "serial": "35" + "".join(rng.choice("0123456789") for _ in range(13)) if has_serial else "",
+        })
+    return items
+
+
+class Canvas:
+    """Text cursor over a PyMuPDF document that starts a new page when full."""
+
+    def __init__(self, doc, font, on_new_page=None):
+        self.doc, self.font = doc, font
+        self.on_new_page = on_new_page
+        self.page = self.writer = None
+        self.y = TOP
+        self.new_page()
+
+    def new_page(self):
+        self.flush()
+        self.page = self.doc.new_page(width=PAGE_W, height=PAGE_H)
+        self.writer = fitz.TextWriter(self.page.rect)
+        self.y = TOP
+        if self.on_new_page:
+            self.on_new_page(self)
+
+    def text(self, x, s, size=FONT_SIZE):
+        self.writer.append((x, self.y), s, font=self.font, fontsize=size)
+
+    def row(self, cells, pitch=ROW):
+        """Write {x: text} cells on the current row, then move down."""
+        if self.y + pitch > BOTTOM:
+            self.new_page()
+        for x, s in cells.items():
+            if s:
+                self.text(x, s)
+        self.y += pitch
+
+    def gap(self, points):
+        self.y += points
+
+    def flush(self):
+        if self.writer is not None:
+            self.writer.write_text(self.page)
+            self.writer = None
+
+
+def draw_old(canvas, rng, inv, cust, phone, cst, items):
+    name, surname = cust
+    canvas.row({LEFT: rng.choice(COMPANIES), 400: "ΑΠΟΔΕΙΞΗ ΛΙΑΝΙΚΗΣ"}, pitch=18)
+    canvas.row({LEFT: f"Αρ. παραστατικού: {inv}", 330: f"Ημερομηνία: {rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2025"})
+    canvas.row({LEFT: "Είδος Παραστατικού", 330: f"Ώρα {rng.randint(1, 12)}:{rng.randint(0, 59):02d} Μ.Μ."}, pitch=24)
+    canvas.row({LEFT: "Στοιχεία Πελάτη"})
+    canvas.row({LEFT: f"{surname} {name}"})
+    canvas.row({LEFT: f"{rng.choice(STREETS)} {rng.randint(1, 200)}, {rng.choice(CITIES)}"})
+    spaced = phone[:2] + " " + phone[2:] if rng.random() < 0.5 else phone
+    canvas.row({LEFT: f"Τηλέφωνο: {spaced}"})
+    if cst:
+        canvas.row({LEFT: f"Κωδ. Πελάτη: {cst}"})
+    canvas.gap(16)
+
+    # SKU and description share one cell in this layout
+    cols = {"sku": LEFT, "qty": 330, "unit": 390, "gross": 500}
+
+    def header(c):
+        c.row({cols["sku"]: "Κωδικός Είδους", cols["qty"]: "Ποσότητα", cols["unit"]: "Τιμή Μονάδος", cols["gross"]: "Αξία"})
+
+    canvas.on_new_page = header
+    header(canvas)
+    for item in items:
+        canvas.row({
+            cols["sku"]: f"{item['sku']} {item['desc']}",
+            cols["qty"]: str(item["qty"]),
+            cols["unit"]: money(item["unit"], rng),
+            cols["gross"]: money(item["gross"], rng),
+        })
+        if item["serial"]:
+            canvas.row({cols["sku"] + 60: f"Σειριακός Αριθμός: {item['serial']}"})
+    canvas.on_new_page = None
+    totals(canvas, rng, items)
+
+
+def draw_new(canvas, rng, inv, cust, phone, cst, items):
+    name, surname = cust
+    canvas.row({LEFT: rng.choice(COMPANIES), 400: rng.choice(["ΑΠΟΔΕΙΞΗ ΛΙΑΝΙΚΗΣ", "Δ.ΑΠΟΣΤΟΛΗΣ"])}, pitch=18)
+    canvas.row({400: inv})
+    canvas.row({400: f"Ημερομηνία {rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2025"}, pitch=24)
+    if rng.random() < 0.5:
+        # value to the right of the label
+        canvas.row({LEFT: "ΕΠΩΝΥΜΙΑ:", 120: f"{surname} {name}"})
+    else:
+        # value stacked under the label, surname first
+        canvas.row({LEFT: "ΕΠΩΝΥΜΙΑ:"})
+        canvas.row({LEFT: surname})
+        canvas.row({LEFT: name})
+    canvas.row({LEFT: f"ΠΟΛΗ: {rng.choice(CITIES)}"})
+    canvas.row({LEFT: f"Δ.Ο.Υ: {rng.choice(CITIES)}"})
+    canvas.row({LEFT: f"ΤΗΛΕΦΩΝΟ: {phone}"})
+    if cst:
+        canvas.row({LEFT: f"ΚΩΔ. ΠΕΛΑΤΗ: {cst}"})
+    canvas.gap(16)
+
+    cols = {"sku": LEFT, "desc": 110, "qty": 350, "unit": 410, "gross": 500}
+
+    def header(c):
+        c.row({cols["sku"]: "Κωδικός Είδους", cols["desc"]: "Περιγραφή", cols["qty"]: "Ποσότητα",
+               cols["unit"]: "Τιμή Μονάδος", cols["gross"]: "Αξία"})
+
+    canvas.on_new_page = header
+    header(canvas)
+    for item in items:
+        canvas.row({
+            cols["sku"]: item["sku"],
+            cols["desc"]: item["desc"],
+            cols["qty"]: str(item["qty"]),
+            cols["unit"]: money(item["unit"], rng),
+            cols["gross"]: money(item["gross"], rng),
+        })
+        if item["serial"]:
+            canvas.row({cols["desc"]: f"Σειριακός: {item['serial']}"})
+    canvas.on_new_page = None
+    totals(canvas, rng, items)
+
+
+def totals(canvas, rng, items):
+    gross = round(sum(i["gross"] for i in items), 2)
+    net = round(gross / 1.19, 2)
+    canvas.gap(10)
+    canvas.row({390: "Καθ. Αξία", 500: money(net, rng)})
+    canvas.row({390: "ΦΠΑ 19%", 500: money(round(gross - net, 2), rng)})
+    canvas.row({390: "Πληρωτέο", 500: money(gross, rng)})
+    canvas.gap(10)
+    canvas.row({LEFT: "ΣΧΟΛΙΑ"})
+
+
+def make_invoice(rng, layout=None):
+    """Draw one invoice; returns (pdf_bytes, expected_fields)."""
+    if fitz is None:
+        raise RuntimeError("PyMuPDF is not installed (pip install PyMuPDF)")
+    layout = layout or rng.choice(["old", "new"])
+    inv = "%06dΑΠΔΑ%06d" % (rng.randint(0, 999999), rng.randint(0, 999999))
+    name, surname = cust = rng.choice(FIRST_NAMES), rng.choice(SURNAMES)
+    phone = random_phone(rng)
+    cst = random_cst(rng)
+    items = random_items(rng)
+
+    doc = fitz.open()
+    canvas = Canvas(doc, fitz.Font("helv"))
+    (draw_old if layout == "old" else draw_new)(canvas, rng, inv, cust, phone, cst, items)
+    canvas.flush()
+    data = doc.tobytes(garbage=3, deflate=True)
+    doc.close()
+
+    best = max(items, key=lambda i: i["gross"])
+    serial = next((i["serial"] for i in items if i["serial"]), "")
+    expected = {
+        "name": name,
+        "surname": surname,
+        "phone": phone,
+        "invoice": inv,
+        "cst code": cst,
+        "material": best["sku"],
+        "product": best["desc"],
+        "serial": serial,
+        "template": layout,
+    }
+    return data, expected
+
+
+def write_corpus(out_dir, count, seed=0, layout=None):
+    """Write count invoices as out_dir/inv_NNNN.pdf + .json; returns the PDF paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for i in range(count):
+        rng = random.Random(f"{seed}:{i}")
+        data, expected = make_invoice(rng, layout)
+        base = os.path.join(out_dir, f"inv_{i:04d}")
+        with open(base + ".pdf", "wb") as f:
+            f.write(data)
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump(expected, f, ensure_ascii=False, indent=2)
+        paths.append(base + ".pdf")
+    return paths
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Generate synthetic invoice PDFs with ground-truth JSON.")
+    ap.add_argument("out_dir", nargs="?", default="corpus", help="output directory (default: corpus)")
+    ap.add_argument("--count", type=int, default=200, help="number of invoices (default: 200)")
+    ap.add_argument("--seed", type=int, default=0, help="corpus seed; same seed, same files")
+    ap.add_argument("--layout", choices=["old", "new"], help="only generate one layout")
+    args = ap.parse_args()
+
+    paths = write_corpus(args.out_dir, args.count, seed=args.seed, layout=args.layout)
+    print(f"wrote {len(paths)} invoices to {args.out_dir}", file=sys.stderr)
@@ -0,0 +1,177 @@
+# loadtest_server.py
+# Throughput of the development server (python TICKETER_IMPROVED.py) against
+# the production entry point (python serve.py) under concurrent clients that
+# mix /parse_pdfs uploads from an invoice_corpus.py corpus with /health checks.
+#
+#   python invoice_corpus.py corpus/ --count 20
+#   python loadtest_server.py corpus/                     # both servers, 16 clients, 20s each
+#   python loadtest_server.py corpus/ --clients 32 --workers 4 --threads 8
+#
+# Each server runs in a fresh temporary directory (empty parse cache) and
+# every upload is made unique, so each /parse_pdfs really parses.
+
+import os, sys, glob, json, time, uuid, random, argparse, tempfile, subprocess
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MODES = {
+    "dev": [sys.executable, os.path.join(HERE, "TICKETER_IMPROVED.py")],
+    "serve": [sys.executable, os.path.join(HERE, "serve.py")],
+}
+CLIENTS = 16
+SECONDS = 20
+PARSE_SHARE = 0.5   # fraction of requests that upload a PDF, the rest hit /health
+STARTUP_TIMEOUT = 120
+
+
+def load_pdfs(corpus_dir):
+    pdfs = []
+    for path in sorted(glob.glob(os.path.join(corpus_dir, "*.pdf"))):
+        with open(path, "rb") as f:
+            pdfs.append(f.read())
+    if not pdfs:
+        raise SystemExit(f"No PDFs in {corpus_dir} (generate them with invoice_corpus.py)")
+    return pdfs
+
+
+def upload_body(pdf):
+    """multipart/form-data body for /parse_pdfs; a comment after %%EOF makes the bytes (and cache key) unique"""
+    boundary = uuid.uuid4().hex
+    data = pdf + f"\n% {uuid.uuid4().hex}\n".encode()
+    body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"pdfs\"; filename=\"invoice.pdf\"\r\n"
+            f"Content-Type: application/pdf\r\n\r\n").encode() + data + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def start_server(mode, port, workdir, workers, threads):
+    env = dict(os.environ, HOST="127.0.0.1", PORT=str(port))
+    if workers:
+        env["WEB_WORKERS"] = str(workers)
+    if threads:
+        env["WEB_THREADS"] = str(threads)
+    log = open(os.path.join(workdir, "server.out"), "wb")
+    return subprocess.Popen(MODES[mode], cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def wait_ready(base, proc, timeout=STARTUP_TIMEOUT):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"server exited with {proc.returncode} during startup")
+        try:
+            urllib.request.urlopen(base + "/health", timeout=2).read()
+            return
+        except OSError:
+            time.sleep(0.5)
+    raise SystemExit(f"server not ready after {timeout}s")
+
+
+def stop_server(proc):
+    proc.terminate()
+    try:
+        proc.wait(60)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def client(base, pdfs, deadline, parse_share, seed):
+    """Issue requests back to back until `deadline`; [(route, seconds, ok)]"""
+    rnd = random.Random(seed)
+    samples = []
+    while time.time() < deadline:
+        if rnd.random() < parse_share:
+            route = "/parse_pdfs"
+            body, ctype = upload_body(rnd.choice(pdfs))
+            req = urllib.request.Request(base + route, data=body, headers={"Content-Type": ctype})
+        else:
+            route = "/health"
+            req = urllib.request.Request(base + route)
+        t0 = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=120) as resp:
+                resp.read()
+                ok = resp.status == 200
+        except OSError:
+            ok = False
+        samples.append((route, time.perf_counter() - t0, ok))
+    return samples
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else None
+
+
+def summarize(samples, seconds):
+    out = {}
+    for route in sorted({r for r, _, _ in samples}) + ["all"]:
+        rows = [s for s in samples if route in ("all", s[0])]
+        ok = [t for _, t, good in rows if good]
+        out[route] = {
+            "requests": len(rows),
+            "errors": len(rows) - len(ok),
+            "per_sec": round(len(ok) / seconds, 2),
+            "p50_ms": round(percentile(ok, 0.50) * 1000, 1) if ok else None,
+            "p95_ms": round(percentile(ok, 0.95) * 1000, 1) if ok else None,
+        }
+    return out
+
+
+def run_mode(mode, pdfs, port, clients, seconds, parse_share, workers, threads):
+    with tempfile.TemporaryDirectory() as workdir:
+        proc = start_server(mode, port, workdir, workers, threads)
+        try:
+            base = f"http://127.0.0.1:{port}"
+            wait_ready(base, proc)
+            client(base, pdfs, time.time() + 2, parse_share, seed=0)  # warm-up
+            started = time.time()
+            deadline = started + seconds
+            with ThreadPoolExecutor(max_workers=clients) as pool:
+                runs = list(pool.map(lambda i: client(base, pdfs, deadline, parse_share, seed=i + 1), range(clients)))
+            elapsed = time.time() - started
+        finally:
+            stop_server(proc)
+    return summarize([s for run in runs for s in run], elapsed)
+
+
+def print_report(reports):
+    print(f"{'server':<7} {'route':<12} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'requests':>9} {'errors':>7}")
+    for mode, report in reports.items():
+        for route, row in report.items():
+            p50 = "-" if row["p50_ms"] is None else f"{row['p50_ms']:.1f}"
+            p95 = "-" if row["p95_ms"] is None else f"{row['p95_ms']:.1f}"
+            print(f"{mode:<7} {route:<12} {row['per_sec']:8.2f} {p50:>9} {p95:>9} {row['requests']:9d} {row['errors']:7d}")
+    if "dev" in reports and "serve" in reports:
+        for route in reports["serve"]:
+            dev, prod = reports["dev"].get(route, {}).get("per_sec"), reports["serve"][route]["per_sec"]
+            if dev:
+                print(f"serve vs dev, {route}: {prod / dev:.2f}x throughput")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Load-test the dev server against serve.py.")
+    ap.add_argument("corpus", nargs="?", default="corpus", help="directory of PDFs from invoice_corpus.py (default: corpus)")
+    ap.add_argument("--mode", choices=sorted(MODES), action="append", help="server(s) to test (default: both)")
+    ap.add_argument("--clients", type=int, default=CLIENTS, help=f"concurrent clients (default: {CLIENTS})")
+    ap.add_argument("--seconds", type=float, default=SECONDS, help=f"measured seconds per server (default: {SECONDS})")
+    ap.add_argument("--parse-share", type=float, default=PARSE_SHARE,
+                    help=f"fraction of requests that are /parse_pdfs uploads (default: {PARSE_SHARE})")
+    ap.add_argument("--workers", type=int, help="serve.py worker processes (default: serve.py's)")
+    ap.add_argument("--threads", type=int, help="serve.py threads per worker (default: serve.py's)")
+    ap.add_argument("--port", type=int, default=5099, help="port the servers listen on (default: 5099)")
+    ap.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = ap.parse_args()
+
+    pdfs = load_pdfs(args.corpus)
+    reports = {}
+    for mode in args.mode or ["dev", "serve"]:
+        print(f"{mode}: {args.clients} clients for {args.seconds:g}s ...", file=sys.stderr)
+        reports[mode] = run_mode(mode, pdfs, args.port, args.clients, args.seconds, args.parse_share,
+                                 args.workers, args.threads)
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+    else:
+        print_report(reports)
@@ -1,9 +1,41 @@
 # mini_invoice_fields_pdfminer.py (fixed for multiple products)
 # Outputs: name, surname, phone, invoice, "cst code", material, product, serial
 
-import sys, re, json
-from pdfminer.high_level import extract_pages
-from pdfminer.layout import LTTextContainer, LTTextLine
+import io, os, sys, re, copy, json, time, glob, signal, argparse, hashlib, sqlite3, threading, tracemalloc
+import shutil, logging
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager, nullcontext
+from functools import cache, cached_property
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from pdfminer.converter import PDFPageAggregator
+from pdfminer.layout import LAParams, LTTextContainer, LTTextLine
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+from pdfminer.pdftypes import PDFStream, resolve1
+from pdfminer.psparser import PSLiteral
+from pdfminer.utils import open_filename
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+try:
+    import pytesseract
+    from pdf2image import convert_from_bytes
+except ImportError:
+    pytesseract = convert_from_bytes = None
+
+try:
+    import resource  # POSIX only: CPU / memory limits for sandboxed batch workers
+except ImportError:
+    resource = None
+
+logger = logging.getLogger(__name__)
 
 # ---------- helpers ----------
 NAME_TOKEN = r"[A-Za-zΑ-Ωα-ωΪΫϊϋΐΰάέήίόύώΆΈΉΊΌΎΏ\.-]+"
@@ -33,6 +65,89 @@ NAME_BLACKLIST = {
     "Τιμή Μονάδος", "Έκπτωση", "Αξία"
 }
 
+# Literal keywords, grouped by what the extractors use them for.
+# Upper-case product words are matched case-insensitively (they used to be
+# checked against line.upper()).
+PRODUCT_KEYWORDS = ["APPLE", "IPHONE", "CHARGER", "CABLE", "CASE", "USB", "SAMSUNG", "MAC", "JBL", "SPEAKER"]
+ACCESSORY_KEYWORDS = ["CHARGER", "CABLE", "CASE", "EARPODS", "HANDSFREE"]
+TABLE_END_MARKERS = ["ΣΚΟΠΟΣ ΔΙΑΚΙΝΗΣΗΣ", "ΤΟΠΟΣ ΑΠΟΣΤΟΛΗΣ", "ΣΧΟΛΙΑ", "Συνολική", "ΤΗΛΕΦΩΝΟ:", "ΠΟΛΗ:"]
+NAME_STOP_WORDS = ["ΠΟΛΗ:", "Δ.Ο.Υ:", "ΤΗΛΕΦΩΝΟ:", "ΑΠΟΔΕΙΞΗ", "Ημερομηνία", "Σειρά", "Κωδικός Είδους"]
+TABLE_LABELS = {"Ώρα", "Μ.Μ.", "Περιγραφή", "Ποσότητα", "Τιμή Μονάδος", "Σειρά", "TMX"}
+
+# category -> (keywords, ignore_case)
+KEYWORD_CATEGORIES = {
+    "name_reject": (sorted(NAME_BLACKLIST) + ["Στοιχεία"], False),
+    "name_stop": (NAME_STOP_WORDS, False),
+    "name_skip": (["Παραστατικού", "Δ.ΑΠΟΣΤΟΛΗΣ", "ΛΙΑΝΙΚΗΣ"], False),
+    "table_header": (["Κωδικός Είδους"], False),
+    "table_end": (TABLE_END_MARKERS, False),
+    "customer_anchor": (["Στοιχεία Πελάτη"], False),
+    "name_label": (["ΕΠΩΝΥΜΙΑ:"], False),
+    "phone_label": (["Τηλέφωνο:"], False),
+    "serial_label": (["σειριακός"], True),
+    "product_inline": (PRODUCT_KEYWORDS, True),
+    "product": (PRODUCT_KEYWORDS + ["EARPODS", "HANDSFREE", "PORTABLE"], True),
+    "value_high": (["IPHONE", "IPAD", "MACBOOK"], True),
+    "samsung": (["SAMSUNG"], True),
+    "phone": (["PHONE"], True),
+    "speaker": (["SPEAKER"], True),
+    "portable": (["PORTABLE"], True),
+    "jbl": (["JBL"], True),
+    "accessory": (ACCESSORY_KEYWORDS, True),
+}
+
+
+class KeywordTagger:
+    """
+    One precompiled matcher for every literal keyword scan in this module.
+
+    All keywords go into a single zero-width alternation (longest first), so one
+    finditer over a line reports the longest keyword starting at each position.
+    Shorter keywords that start at the same position are confirmed with their
+    own pattern, which keeps overlapping hits ("MACBOOK" / "MAC") exact.
+    """
+
+    def __init__(self, categories):
+        cats = {}
+        for category, (words, ignore_case) in categories.items():
+            for word in words:
+                cats.setdefault((word, ignore_case), set()).add(category)
+        self._keys = sorted(cats, key=lambda k: -len(k[0]))
+        self._cats = [frozenset(cats[k]) for k in self._keys]
+        self._patterns = [
+            re.compile(re.escape(word), re.IGNORECASE if ignore_case else 0)
+            for word, ignore_case in self._keys
+        ]
+        self._prefixes = [
+            [j for j, (other, _) in enumerate(self._keys)
+             if j != i and len(other) <= len(word) and word.casefold().startswith(other.casefold())]
+            for i, (word, _) in enumerate(self._keys)
+        ]
+        alternation = "|".join(
+            "(?P<k%d>%s)" % (i, p.pattern if not ignore_case else "(?i:%s)" % p.pattern)
+            for i, (p, (_, ignore_case)) in enumerate(zip(self._patterns, self._keys))
+        )
+        self._re = re.compile("(?=%s)" % alternation if alternation else "(?!)")
+
+    def tag(self, line):
+        """Return the frozenset of categories whose keywords occur in `line`."""
+        tags = set()
+        for m in self._re.finditer(line):
+            i = int(m.lastgroup[1:])
+            tags |= self._cats[i]
+            for j in self._prefixes[i]:
+                if self._patterns[j].match(line, m.start()):
+                    tags |= self._cats[j]
+        return frozenset(tags)
+
+
+KEYWORDS = KeywordTagger(KEYWORD_CATEGORIES)
+
+
+def tag_lines(lines):
+    """Tag every line once; extractors read these instead of rescanning strings."""
+    return [KEYWORDS.tag(s) for s in lines]
+
 
 def is_bad_cst(s: str) -> bool:
     """Reject dot-like junk sequences that pdfminer generates."""
@@ -48,17 +163,537 @@ def is_bad_cst(s: str) -> bool:
     return False
 
 
-def get_lines(pdf_path):
-    lines = []
-    for page in extract_pages(pdf_path):
+# ---------- line geometry ----------
+# Text lines keep the box the layout engine placed them in. Coordinates are
+# top-down page units (y grows towards the bottom) for every backend; page is
+# the 0-based page number.
+LineBox = namedtuple("LineBox", "text page x0 y0 x1 y1")
+
+ROW_SLACK = 2.0  # points a right-hand neighbour may start left of the label's edge
+
+
+class SpatialIndex:
+    """
+    Line boxes sorted by (page, top), so "right of" / "below" a label is a
+    bisect plus a scan of the few lines in range instead of a document walk.
+    Results are line numbers into the list the index was built from.
+    """
+
+    def __init__(self, boxes):
+        self.boxes = boxes
+        self._order = sorted(range(len(boxes)), key=lambda i: (boxes[i].page, boxes[i].y0, boxes[i].x0))
+        self._keys = [(boxes[i].page, boxes[i].y0) for i in self._order]
+        self._max_height = max((b.y1 - b.y0 for b in boxes), default=0.0)
+
+    def _tops_between(self, page, top, bottom):
+        """Lines whose top edge lies in [top, bottom] on the page, top-down."""
+        lo = bisect_left(self._keys, (page, top))
+        hi = bisect_right(self._keys, (page, bottom))
+        return self._order[lo:hi]
+
+    def right_of(self, i):
+        """Lines on the same row as line i that start at or after its right edge, left-to-right."""
+        b = self.boxes[i]
+        mid = (b.y0 + b.y1) / 2
+        row = [j for j in self._tops_between(b.page, b.y0 - self._max_height, b.y1)
+               if j != i and self.boxes[j].y0 <= mid <= self.boxes[j].y1
+               and self.boxes[j].x0 >= b.x1 - ROW_SLACK]
+        return sorted(row, key=lambda j: self.boxes[j].x0)
+
+    def below(self, i, max_lines):
+        """Lines starting under line i within max_lines of its height and not left of it, top-down."""
+        b = self.boxes[i]
+        h = (b.y1 - b.y0) or 1.0
+        return [j for j in self._tops_between(b.page, b.y1 - h / 2, b.y1 + max_lines * h)
+                if j != i and self.boxes[j].x1 > b.x0]
+
+
+def anchor_windows(i, max_lines, n, index=None):
+    """
+    Candidate line numbers following anchor line i, as successive sequences to try:
+    the geometric neighbours (right of, then below) when an index is available,
+    then the next max_lines - 1 lines in reading order.
+    """
+    if index is not None:
+        yield index.right_of(i) + index.below(i, max_lines)
+    yield range(i + 1, min(n, i + max_lines))
+
+
+# ---------- per-document line views ----------
+class LineIndex:
+    """
+    One document's lines plus the derived views every extractor reads:
+    stripped / space-free text, token lists, keyword tags, the first 8-digit
+    phone on each line and inverted token / tag -> line numbers indexes. Views are
+    built on first use and then shared. `spatial` is a SpatialIndex when the
+    lines came as LineBox records, else None.
+    """
+
+    def __init__(self, lines):
+        lines = list(lines)
+        if lines and isinstance(lines[0], LineBox):
+            self.spatial = SpatialIndex(lines)
+            lines = [b.text for b in lines]
+        else:
+            self.spatial = None
+        self.lines = lines
+
+    def __len__(self):
+        return len(self.lines)
+
+    @cached_property
+    def full(self):
+        return "\n".join(self.lines)
+
+    @cached_property
+    def stripped(self):
+        return [s.strip() for s in self.lines]
+
+    @cached_property
+    def nospace(self):
+        return [s.replace(" ", "") for s in self.lines]
+
+    @cached_property
+    def tokens(self):
+        return [s.split() for s in self.lines]
+
+    @cached_property
+    def tags(self):
+        return tag_lines(self.lines)
+
+    @cached_property
+    def phone8(self):
+        """First PHONE8_RE match per line (spaces removed), or None."""
+        return [m.group(1) if m else None for m in map(PHONE8_RE.search, self.nospace)]
+
+    @cached_property
+    def by_token(self):
+        """token -> line numbers containing it; keys are in first-occurrence order."""
+        index = {}
+        for i, tokens in enumerate(self.tokens):
+            for token in tokens:
+                lines = index.setdefault(token, [])
+                if not lines or lines[-1] != i:
+                    lines.append(i)
+        return index
+
+    @cached_property
+    def by_tag(self):
+        """keyword category -> numbers of the lines tagged with it, in order."""
+        index = {}
+        for i, line_tags in enumerate(self.tags):
+            for tag in line_tags:
+                index.setdefault(tag, []).append(i)
+        return index
+
+    def first_line_tagged(self, tag):
+        """Number of the first line tagged `tag`, or None."""
+        lines = self.by_tag.get(tag)
+        return lines[0] if lines else None
+
+
+def line_index(lines):
+    """`lines` as a LineIndex (already-built indexes are passed through)."""
+    return lines if isinstance(lines, LineIndex) else LineIndex(lines)
+
+
+# ---------- text extraction backends ----------
+# A backend turns a PDF (a path, a bytes object or a binary file object) into
+# the ordered, non-empty, stripped text lines of each page, as LineBox records.
+# Pick one with the `backend` argument or $PDFDATA2_BACKEND.
+BACKEND_ENV = "PDFDATA2_BACKEND"
+DEFAULT_BACKEND = "pdfminer"
+FONT_CACHE_SIZE = 256  # decoded fonts a PdfminerContext keeps across documents
+FONT_METRIC_KEYS = {"Widths", "W", "W2"}
+STREAM_PAGES_FROM = 8  # page count from which pdfminer stops caching parsed objects
+
+
+def font_fingerprint(obj, depth=0):
+    """
+    Content key for a font spec: its dictionaries with references resolved and
+    streams (font programs, ToUnicode CMaps) replaced by a hash of their data.
+    Object ids are per document, so they cannot key a cross-document cache.
+    Glyph width tables go in as a digest: pdfminer lays text out with them, not
+    with the font program, and a non-embedded font has no other metrics.
+    """
+    if depth > 10:
+        raise ValueError("font spec nested too deeply")
+    obj = resolve1(obj)
+    if isinstance(obj, PDFStream):
+        return ("stream", hashlib.sha1(obj.get_data()).hexdigest(), font_fingerprint(obj.attrs, depth + 1))
+    if isinstance(obj, dict):
+        return tuple(sorted((k, _metrics_digest(v) if k in FONT_METRIC_KEYS else font_fingerprint(v, depth + 1))
+                            for k, v in obj.items()))
+    if isinstance(obj, (list, tuple)):
+        return tuple(font_fingerprint(v, depth + 1) for v in obj)
+    if isinstance(obj, PSLiteral):
+        return ("/", obj.name)
+    return obj
+
+
+def _metrics_digest(obj):
+    """Hash of a glyph width table (Widths / W / W2), numbers only in the usual case."""
+    obj = resolve1(obj)
+    if isinstance(obj, list) and all(
+            isinstance(v, (int, float)) or isinstance(v, list) and all(isinstance(w, (int, float)) for w in v)
+            for v in obj):
+        values = obj
+    else:
+        values = font_fingerprint(obj)  # references inside: resolve them
+    return ("metrics", hashlib.sha1(repr(values).encode()).hexdigest())
+
+
+class FontCache:
+    """Thread-safe LRU of decoded pdfminer fonts keyed by font_fingerprint()."""
+
+    def __init__(self, max_entries=FONT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._fonts = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            font = self._fonts.get(key)
+            if font is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._fonts.move_to_end(key)
+            return font
+
+    def put(self, key, font):
+        with self._lock:
+            self._fonts[key] = font
+            self._fonts.move_to_end(key)
+            while len(self._fonts) > self.max_entries:
+                self._fonts.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._fonts.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {"fonts": len(self._fonts), "hits": self.hits, "misses": self.misses}
+
+
+class _DocumentResources(PDFResourceManager):
+    """Per-document resource manager that takes its fonts from a shared FontCache."""
+
+    def __init__(self, font_cache):
+        super().__init__(caching=False)
+        self.font_cache = font_cache
+        self._by_objid = {}
+
+    def get_font(self, objid, spec):
+        if objid and objid in self._by_objid:
+            return self._by_objid[objid]
+        if not self.font_cache.max_entries:
+            font = super().get_font(None, spec)
+            if objid:
+                self._by_objid[objid] = font
+            return font
+        try:
+            key = font_fingerprint(spec)
+            hash(key)
+        except Exception:
+            key = None  # odd spec: decode it for this document only
+        font = self.font_cache.get(key) if key is not None else None
+        if font is None:
+            font = super().get_font(None, spec)
+            if key is not None:
+                self.font_cache.put(key, font)
+        if objid:
+            self._by_objid[objid] = font
+        return font
+
+
+class PdfminerContext:
+    """
+    pdfminer state worth keeping across documents in a long-lived worker:
+    the LAParams and a bounded cache of decoded fonts (font programs and
+    ToUnicode CMaps), so invoices from the same template skip font setup
+    after the first one. Safe to share between threads; reset() drops the cache.
+    """
+
+    def __init__(self, laparams=None, max_fonts=FONT_CACHE_SIZE, stream_pages_from=STREAM_PAGES_FROM):
+        self.laparams = laparams if laparams is not None else LAParams()
+        self.font_cache = FontCache(max_fonts)
+        self.stream_pages_from = stream_pages_from
+
+    @cached_property
+    def skim_laparams(self):
+        """self.laparams without the reading-order pass over text boxes (over half of layout time)."""
+        laparams = copy.copy(self.laparams)
+        laparams.boxes_flow = None
+        return laparams
+
+    def iter_layouts(self, pdf, reading_order=True):
+        """
+        Yield the LTPage layout of each page of a path or binary file object.
+        reading_order=False keeps the same lines but orders text boxes top-down.
+
+        Each layout tree is dropped by the device once it has been handed out.
+        Documents of stream_pages_from pages or more are also read without
+        pdfminer's object cache, which otherwise keeps every page's decoded
+        content stream alive: slower for shared objects (~20%), but memory
+        stays flat however long the statement is.
+        """
+        with open_filename(pdf, "rb") as fp:
+            doc = PDFDocument(PDFParser(fp))
+            if self.stream_pages_from is not None and _page_count(doc) >= self.stream_pages_from:
+                doc.caching = False
+            rsrcmgr = _DocumentResources(self.font_cache)
+            laparams = self.laparams if reading_order else self.skim_laparams
+            device = PDFPageAggregator(rsrcmgr, laparams=laparams)
+            interpreter = PDFPageInterpreter(rsrcmgr, device)
+            for page in PDFPage.create_pages(doc):
+                interpreter.process_page(page)
+                layout = device.get_result()
+                device.result = device.cur_item = None
+                yield layout
+                del layout
+
+    def reset(self):
+        self.font_cache.clear()
+
+    def stats(self):
+        return self.font_cache.stats()
+
+
+def _page_count(doc):
+    """Page count from the document's page tree (0 if it can't be read)."""
+    try:
+        return int(resolve1(resolve1(doc.catalog["Pages"])["Count"]))
+    except Exception:
+        return 0
+
+
+class PdfminerBackend:
+    """Full pdfminer layout analysis (pure Python, slow, the reference output)."""
+    name = "pdfminer"
+
+    def __init__(self, context=None):
+        # None: a fresh context without a font cache for every document
+        self.context = context
+
+    def iter_pages(self, pdf_path, reading_order=True):
+        if isinstance(pdf_path, (bytes, bytearray, memoryview)):
+            pdf_path = io.BytesIO(pdf_path)
+        context = self.context or PdfminerContext(max_fonts=0)
+        for page_no, page in enumerate(context.iter_layouts(pdf_path, reading_order)):
+            lines = self.page_lines(page_no, page)
+            del page  # only the compact LineBox records outlive the layout tree
+            yield lines
+
+    @staticmethod
+    def page_lines(page_no, page):
+        height = page.height  # pdfminer is bottom-up; flip to top-down
+        lines = []
         for el in page:
             if isinstance(el, LTTextContainer):
                 for tl in el:
                     if isinstance(tl, LTTextLine):
                         s = tl.get_text().strip()
                         if s:
-                            lines.append(s)
-    return lines
+                            lines.append(LineBox(s, page_no, tl.x0, height - tl.y1, tl.x1, height - tl.y0))
+        return lines
+
+
+class PyMuPDFBackend:
+    """MuPDF text extraction (C, ~10x faster): words regrouped into pdfminer-style lines."""
+    name = "pymupdf"
+
+    def iter_pages(self, pdf_path, reading_order=True):
+        if fitz is None:
+            raise RuntimeError("PyMuPDF is not installed (pip install PyMuPDF)")
+        if isinstance(pdf_path, (str, os.PathLike)):
+            doc = fitz.open(pdf_path)
+        else:
+            doc = fitz.open(stream=read_pdf_bytes(pdf_path), filetype="pdf")
+        with doc:
+            for page_no, page in enumerate(doc):
+                blocks = {}
+                for x0, y0, x1, y1, word, block_no, line_no, _ in page.get_text("words"):
+                    block = blocks.setdefault(block_no, {"top": y0, "left": x0, "lines": {}})
+                    block["top"] = min(block["top"], y0)
+                    block["left"] = min(block["left"], x0)
+                    block["lines"].setdefault(line_no, []).append((word, x0, y0, x1, y1))
+                # top-to-bottom, then left-to-right, like pdfminer's text boxes
+                lines = []
+                for block in sorted(blocks.values(), key=lambda b: (round(b["top"]), b["left"])):
+                    for words in block["lines"].values():
+                        s = " ".join(w[0] for w in words).strip()
+                        if s:
+                            lines.append(LineBox(
+                                s, page_no,
+                                min(w[1] for w in words), min(w[2] for w in words),
+                                max(w[3] for w in words), max(w[4] for w in words),
+                            ))
+                yield lines
+
+
+BACKENDS = {
+    PdfminerBackend.name: PdfminerBackend,
+    PyMuPDFBackend.name: PyMuPDFBackend,
+}
+
+
+def get_backend(name=None):
+    """
+    Resolve a backend by name, falling back to $PDFDATA2_BACKEND, then pdfminer.
+    Backend instances are passed through unchanged.
+    """
+    if hasattr(name, "iter_pages"):
+        return name
+    name = (name or os.environ.get(BACKEND_ENV) or DEFAULT_BACKEND).strip().lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown PDF backend {name!r} (choose from {', '.join(sorted(BACKENDS))})")
+    return BACKENDS[name]()
+
+
+_warm_backends = {}
+_warm_lock = threading.Lock()
+
+
+def warm_backend(name=None):
+    """
+    This process's long-lived instance of a backend. The pdfminer one keeps a
+    PdfminerContext, so every document after the first reuses its decoded
+    fonts; warm_backend("pdfminer").context.reset() empties that cache.
+    """
+    backend = get_backend(name)
+    with _warm_lock:
+        if backend.name not in _warm_backends:
+            if isinstance(backend, PdfminerBackend) and backend.context is None:
+                backend.context = PdfminerContext()
+            _warm_backends[backend.name] = backend
+        return _warm_backends[backend.name]
+
+
+def read_pdf_bytes(pdf_path) -> bytes:
+    """Raw bytes of a PDF given as a path, a bytes object or a binary file object."""
+    if isinstance(pdf_path, (bytes, bytearray, memoryview)):
+        return bytes(pdf_path)
+    if hasattr(pdf_path, "read"):
+        return pdf_path.read()
+    with open(pdf_path, "rb") as f:
+        return f.read()
+
+
+def iter_pages(pdf_path, backend=None, reading_order=True):
+    """
+    Yield the non-empty text lines (LineBox records) of each page, one page at a time.
+    reading_order=False lets a backend skip line-ordering work, for callers
+    that only want fields in ORDER_FREE_FIELDS.
+    """
+    backend = get_backend(backend)
+    if reading_order:
+        yield from backend.iter_pages(pdf_path)
+    else:
+        yield from backend.iter_pages(pdf_path, reading_order=False)
+
+
+def get_lines(pdf_path, backend=None):
+    """Lazily yield the LineBox records of the PDF; pages are laid out on demand."""
+    for page_lines in iter_pages(pdf_path, backend):
+        yield from page_lines
+
+
+# ---------- OCR fallback ----------
+# Scanned invoices and phone photos have no text layer. When a document yields
+# fewer than OCR_MIN_LINES lines, its first page is rasterized and OCRed with
+# Tesseract; the words come back as LineBox records for the normal extractors.
+OCR_MIN_LINES = 5
+OCR_DPI = 300             # below ~250 Tesseract misreads Greek accents; above 300 is just slower
+OCR_LANG = "ell+eng"
+# Pages OCRed at a time by one process, and the size of extract_many's OCR
+# pool: its parse workers hand scans over instead of OCRing (or waiting) there
+OCR_WORKERS = int(os.environ.get("PDFDATA2_OCR_WORKERS", 1))
+OCR_CACHE_SIZE = 64
+OCR_DEFERRED = "deferred"  # extract(ocr=OCR_DEFERRED): raise OcrDeferred instead of OCRing
+
+
+class OcrDeferred(Exception):
+    """The document needs OCR and extract() was told to leave that to the caller."""
+
+
+@cache
+def ocr_available() -> bool:
+    """The Python packages and the tesseract / pdftoppm (poppler) binaries they drive."""
+    return (pytesseract is not None and convert_from_bytes is not None
+            and shutil.which(pytesseract.pytesseract.tesseract_cmd) is not None
+            and shutil.which("pdftoppm") is not None)
+
+
+class OcrFallback:
+    """First-page OCR, at most max_concurrent pages at a time, cached by the SHA-256 of the PDF."""
+
+    def __init__(self, dpi=OCR_DPI, lang=OCR_LANG, max_entries=OCR_CACHE_SIZE, max_concurrent=OCR_WORKERS):
+        self.dpi = dpi
+        self.lang = lang
+        self.max_entries = max_entries
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def lines(self, data: bytes):
+        """The LineBox records Tesseract reads on the first page of the PDF bytes."""
+        if not ocr_available():
+            raise RuntimeError("OCR needs pytesseract and pdf2image (pip install pytesseract pdf2image)")
+        key = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            lines = self._results.get(key)
+            if lines is not None:
+                self.hits += 1
+                self._results.move_to_end(key)
+                return list(lines)
+            self.misses += 1
+        with self.slots:
+            lines = self._recognize(data)
+        with self._lock:
+            self._results[key] = tuple(lines)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+        return lines
+
+    def _recognize(self, data):
+        images = convert_from_bytes(data, dpi=self.dpi, first_page=1, last_page=1, grayscale=True)
+        if not images:
+            return []
+        # one Tesseract thread per slot, or each OCR would still take every core
+        os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+        words = pytesseract.image_to_data(images[0], lang=self.lang, output_type=pytesseract.Output.DICT)
+        lines = {}  # (block, paragraph, line) -> words, in Tesseract's reading order
+        for i, word in enumerate(words["text"]):
+            word = word.strip()
+            if not word or float(words["conf"][i]) < 0:
+                continue
+            x0, y0 = words["left"][i], words["top"][i]
+            lines.setdefault((words["block_num"][i], words["par_num"][i], words["line_num"][i]), []).append(
+                (word, x0, y0, x0 + words["width"][i], y0 + words["height"][i]))
+        scale = 72.0 / self.dpi  # pixels -> PDF points, like the text backends
+        return [
+            LineBox(" ".join(w[0] for w in ws), 0,
+                    min(w[1] for w in ws) * scale, min(w[2] for w in ws) * scale,
+                    max(w[3] for w in ws) * scale, max(w[4] for w in ws) * scale)
+            for ws in lines.values()
+        ]
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {"pages": len(self._results), "hits": self.hits, "misses": self.misses}
+
+
+ocr_fallback = OcrFallback()
 
 
 def parse_money(s: str):
@@ -71,16 +706,111 @@ def parse_money(s: str):
     return float(m.group(0)) if m else None
 
 
-def looks_like_name(s: str) -> bool:
+# ---------- money analysis ----------
+VAT_RATE_PERCENT = 19
+VAT_TOLERANCE_CENTS = 50   # a VAT amount matches when abs(price - base * 0.19) < 0.50
+
+
+def scan_money(lines):
+    """
+    Single MONEY_RE pass over the whole document.
+    Returns (line_number, value) pairs in document order.
+    """
+    starts = []
+    offset = 0
+    for line in lines:
+        starts.append(offset)
+        offset += len(line) + 1
+    full = "\n".join(lines)
+
+    found = []
+    for m in MONEY_RE.finditer(full):
+        try:
+            value = float(m.group(0).replace(".", "").replace(",", "."))
+        except ValueError:  # e.g. "1,026,18"
+            continue
+        found.append((bisect_right(starts, m.start()) - 1, value))
+    return found
+
+
+def find_vat_prices(cents):
+    """
+    Return the set of values in `cents` that are the 19% VAT of another value.
+    Sorted-array lookup: |100*p - 19*base| < 5000 gives a closed range of bases.
+    """
+    ordered = sorted(cents)
+    vat = set()
+    for p in ordered:
+        lo = (100 * p - 100 * VAT_TOLERANCE_CENTS) // VAT_RATE_PERCENT + 1
+        hi = -((-(100 * p + 100 * VAT_TOLERANCE_CENTS)) // VAT_RATE_PERCENT) - 1
+        i, j = bisect_left(ordered, lo), bisect_right(ordered, hi)
+        if any(base != p for base in ordered[i:j]):
+            vat.add(p)
+    return vat
+
+
+# ---------- subset sums (totals / subtotals) ----------
+SUM_TOLERANCE_CENTS = 99   # a sum matches when abs(price - total) < 1.00
+SUM_MIN_TERMS = 2
+SUM_MAX_TERMS = 9
+SUM_WORK_BUDGET = 64       # max prices folded into the DP (bounds worst-case time)
+
+
+def find_sum_prices(cents):
+    """
+    Return the set of values in `cents` (integer cents, all > SUM_TOLERANCE_CENTS)
+    that are the sum of 2..9 OTHER values of the list, within 1.00.
+
+    Bitset DP: bit s of reach[k] is set when k prices add up to s cents.
+    Prices are folded in ascending order and a target only ever sees the prices
+    that are small enough to sit next to another price in one of its sums, so it
+    never sees itself. At most SUM_WORK_BUDGET prices are folded in; on
+    pathological lists the largest ones are then ignored as summands.
+    """
+    if len(cents) < 3:
+        return set()
+
+    values = sorted(cents)
+    smallest = values[0]
+    mask = (1 << (values[-1] + SUM_TOLERANCE_CENTS + 1)) - 1
+    window = (1 << (2 * SUM_TOLERANCE_CENTS + 1)) - 1
+
+    reach = [1] + [0] * SUM_MAX_TERMS
+    reachable = 0  # union of reach[SUM_MIN_TERMS:]
+    added = 0
+    sums = set()
+
+    for target in values:
+        grew = False
+        while (added < len(values) and added < SUM_WORK_BUDGET
+               and values[added] + smallest <= target + SUM_TOLERANCE_CENTS):
+            p = values[added]
+            for k in range(SUM_MAX_TERMS, 0, -1):
+                reach[k] |= (reach[k - 1] << p) & mask
+            added += 1
+            grew = True
+        if grew:
+            reachable = 0
+            for k in range(SUM_MIN_TERMS, SUM_MAX_TERMS + 1):
+                reachable |= reach[k]
+
+        lo = target - SUM_TOLERANCE_CENTS
+        if (reachable >> lo) & window:
+            sums.add(target)
+
+    return sums
+
+
+def looks_like_name(s: str, tags=None) -> bool:
     """Check if a string looks like a person's name"""
-    if ":" in s or "Στοιχεία" in s: 
+    if tags is None:
+        tags = KEYWORDS.tag(s)
+    if ":" in s:
         return False
     if any(ch.isdigit() for ch in s): 
         return False
-    # Check blacklist
-    if s in NAME_BLACKLIST:
-        return False
-    if any(blacklisted in s for blacklisted in NAME_BLACKLIST):
+    # Check blacklist (and "Στοιχεία")
+    if "name_reject" in tags:
         return False
     # Should match name pattern and be reasonable length
     if not NAME_LINE_RE.match(s):
@@ -97,13 +827,11 @@ def looks_like_name(s: str) -> bool:
 def parse_items(lines, phone_to_exclude=""):
     """Parse items from invoice - handles both single and multiple products"""
     items = []
+    doc = line_index(lines)
+    lines, tags = doc.lines, doc.tags
     
     # Find where "Κωδικός Είδους" appears (table header)
-    table_start = None
-    for i, line in enumerate(lines):
-        if "Κωδικός Είδους" in line:
-            table_start = i
-            break
+    table_start = doc.first_line_tagged("table_header")
     
     if table_start is None:
         return items
@@ -112,9 +840,10 @@ def parse_items(lines, phone_to_exclude=""):
     skus = []
     sku_positions = {}
     sku_with_desc = {}  # Store descriptions that appear on same line as SKU
+    desc_tags = {}  # Tags of the line each description came from
     
     for i in range(table_start + 1, len(lines)):
-        line = lines[i].strip()
+        line = doc.stripped[i]
         
         # Check for standalone SKU
         if SKU_RE.match(line) and line != phone_to_exclude:
@@ -122,22 +851,24 @@ def parse_items(lines, phone_to_exclude=""):
             sku_positions[line] = i
         else:
             # Check for "SKU Description" format (e.g., "1967787 HANDSFREE APPLE...")
-            parts = line.split(None, 1)  # Split on first whitespace
+            parts = doc.tokens[i]
             if len(parts) >= 2 and SKU_RE.match(parts[0]) and parts[0] != phone_to_exclude:
                 sku = parts[0]
-                desc = parts[1]
+                desc = line.split(None, 1)[1]  # everything after the first whitespace
                 skus.append(sku)
                 sku_positions[sku] = i
                 # Store the description that was on the same line
-                if any(keyword in desc.upper() for keyword in ["APPLE", "IPHONE", "CHARGER", "CABLE", "CASE", "USB", "SAMSUNG", "MAC", "JBL", "SPEAKER"]):
+                if "product_inline" in tags[i]:
                     sku_with_desc[sku] = desc
+                    desc_tags[sku] = tags[i]
     
     if not skus:
         return items
+    sku_set = set(skus)
     
     # Find product descriptions for SKUs that don't have them yet
     max_sku_pos = max(sku_positions.values()) if sku_positions else table_start
-    standalone_descriptions = []  # Descriptions that appear in the table area
+    desc_at = {}  # line number -> standalone description in the table area
     product_descriptions = {}  # Initialize the dictionary
     
     # First, use descriptions that were on the same line as SKUs
@@ -148,27 +879,27 @@ def parse_items(lines, phone_to_exclude=""):
     # Collect ALL standalone description lines in the table area (not just after last SKU)
     # Descriptions can appear between SKUs or after the last one
     for i in range(table_start + 1, min(max_sku_pos + 15, len(lines))):
-        candidate = lines[i].strip()
+        candidate = doc.stripped[i]
         
         # Stop at end-of-table markers
-        if any(marker in candidate for marker in ["ΣΚΟΠΟΣ ΔΙΑΚΙΝΗΣΗΣ", "ΤΟΠΟΣ ΑΠΟΣΤΟΛΗΣ", "ΣΧΟΛΙΑ", "Συνολική", "ΤΗΛΕΦΩΝΟ:", "ΠΟΛΗ:"]):
+        if "table_end" in tags[i]:
             break
         
         # Skip if it's a SKU line (standalone or at start of line)
         if SKU_RE.match(candidate):
             continue
-        parts = candidate.split()
-        if parts and SKU_RE.match(parts[0]) and parts[0] in [str(s) for s in skus]:
+        parts = doc.tokens[i]
+        if parts and SKU_RE.match(parts[0]) and parts[0] in sku_set:
             continue
         
         # Skip table headers, labels, and serials
-        if candidate in ["Ώρα", "Μ.Μ.", "Περιγραφή", "Ποσότητα", "Τιμή Μονάδος", "Σειρά", "TMX"]:
+        if candidate in TABLE_LABELS:
             continue
-        if "Σειριακός" in candidate or "σειριακός" in candidate.lower():
+        if "serial_label" in tags[i]:
             continue
         
         # Skip pure numbers and money amounts
-        if candidate.replace(".", "").replace(",", "").replace(" ", "").isdigit():
+        if doc.nospace[i].replace(".", "").replace(",", "").isdigit():
             continue
         if MONEY_RE.fullmatch(candidate):
             continue
@@ -176,69 +907,65 @@ def parse_items(lines, phone_to_exclude=""):
         # If it contains letters and looks like a product description
         if re.search(r"[A-Za-zΑ-Ωα-ω]", candidate) and len(candidate) > 3:
             # Common product keywords
-            if any(keyword in candidate.upper() for keyword in ["APPLE", "IPHONE", "CHARGER", "CABLE", "CASE", "USB", "SAMSUNG", "MAC", "JBL", "SPEAKER", "EARPODS", "HANDSFREE", "PORTABLE"]):
-                standalone_descriptions.append((i, candidate))  # Store with line number
+            if "product" in tags[i]:
+                desc_at[i] = candidate
     
     # Match standalone descriptions to SKUs by proximity
-    # For each SKU without a description, find the nearest description line
+    # For each SKU without a description, take the nearest description line
+    # (the earlier one on a tie) whose text no SKU is using yet
+    used = {}  # description text -> number of SKUs currently holding it
+    for desc in product_descriptions.values():
+        used[desc] = used.get(desc, 0) + 1
+    lines_of = {}  # description text -> its line numbers
+    for i, desc in desc_at.items():
+        lines_of.setdefault(desc, []).append(i)
+    free = sorted(i for i, desc in desc_at.items() if desc not in used)
+
     skus_without_desc = [sku for sku in skus if sku not in product_descriptions]
     for sku in skus_without_desc:
         sku_line = sku_positions[sku]
-        # Find closest description (prefer one right after, but also check before)
-        best_desc = None
-        min_distance = float('inf')
-        for desc_line, desc_text in standalone_descriptions:
-            distance = abs(desc_line - sku_line)
-            if distance < min_distance and desc_text not in product_descriptions.values():
-                min_distance = distance
-                best_desc = desc_text
-        if best_desc:
-            product_descriptions[sku] = best_desc
+        k = bisect_left(free, sku_line)
+        before = free[k - 1] if k > 0 else None
+        after = free[k] if k < len(free) else None
+        if before is None and after is None:
+            continue
+        if after is None or (before is not None and sku_line - before <= after - sku_line):
+            best_line = before
+        else:
+            best_line = after
+        best_desc = desc_at[best_line]
+        # A repeated SKU gives its previous description back
+        previous = product_descriptions.get(sku)
+        if previous is not None:
+            used[previous] -= 1
+            if not used[previous]:
+                for i in lines_of.get(previous, ()):
+                    free.insert(bisect_left(free, i), i)
+        product_descriptions[sku] = best_desc
+        desc_tags[sku] = tags[best_line]
+        used[best_desc] = used.get(best_desc, 0) + 1
+        if used[best_desc] == 1:
+            for i in lines_of[best_desc]:
+                del free[bisect_left(free, i)]
     
     # Collect all prices in the entire document (PDFMiner may extract in non-sequential order)
-    all_prices = []
-    for i, line in enumerate(lines):
-        for m in MONEY_RE.findall(line):
-            t = m.replace(".", "").replace(",", ".")
-            try:
-                val = float(t)
-                # Only consider reasonable product prices
-                if 10 <= val <= 10000:  # Products typically cost between 10 and 10,000
-                    all_prices.append(val)
-            except:
-                pass
-    
+    # Only consider reasonable product prices (between 10 and 10,000)
+    all_prices = {val for _, val in scan_money(lines) if 10 <= val <= 10000}
+
     # Remove duplicates and sort descending
-    all_prices = sorted(list(set(all_prices)), reverse=True)
-    
+    all_prices = sorted(all_prices, reverse=True)
+    all_cents = [round(p * 100) for p in all_prices]
+
     # Filter out non-product prices:
     # 1. Remove VAT amounts (typically 19% of another price)
-    def is_vat(price, prices, vat_rate=0.19):
-        for base in prices:
-            if base != price and abs(price - base * vat_rate) < 0.5:
-                return True
-        return False
-    
-    # 2. Remove sums (totals and subtotals) - check for sums of 2 or more prices
-    def is_sum(price, prices):
-        from itertools import combinations
-        # Check sums of 2 prices
-        for i, p1 in enumerate(prices):
-            for p2 in prices[i+1:]:
-                if p1 != price and p2 != price and abs(price - (p1 + p2)) < 1:
-                    return True
-        # Check sums of 3+ prices (for multi-product subtotals)
-        if len(prices) >= 4:
-            for count in range(3, min(len(prices), 10)):
-                for combo in combinations([p for p in prices if p != price], count):
-                    if abs(price - sum(combo)) < 1:
-                        return True
-        return False
-    
-    product_prices = []
-    for price in all_prices:
-        if not is_vat(price, all_prices) and not is_sum(price, all_prices):
-            product_prices.append(price)
+    # 2. Remove sums (totals and subtotals) - sums of 2 to 9 other prices
+    vat_cents = find_vat_prices(all_cents)
+    sum_cents = find_sum_prices(all_cents)
+
+    product_prices = [
+        price for price, cents in zip(all_prices, all_cents)
+        if cents not in vat_cents and cents not in sum_cents
+    ]
     
     # If filtering removed too much, fallback to using top prices
     if len(product_prices) < len(skus):
@@ -260,29 +987,29 @@ def parse_items(lines, phone_to_exclude=""):
         # Sort product prices descending
         sorted_prices = sorted(product_prices, reverse=True)
         
-        # Create ranking of items by likely value (based on description)
-        def product_value_score(desc):
-            desc_upper = desc.upper()
+        # Create ranking of items by likely value (based on description tags)
+        def product_value_score(t):
             # Phones and tablets are high value
-            if "IPHONE" in desc_upper or "IPAD" in desc_upper or "MACBOOK" in desc_upper:
+            if "value_high" in t:
                 return 1000
-            if "SAMSUNG" in desc_upper and "PHONE" in desc_upper:
+            if "samsung" in t and "phone" in t:
                 return 1000
             # Speakers are medium-high value
-            if "SPEAKER" in desc_upper and "PORTABLE" in desc_upper:
+            if "speaker" in t and "portable" in t:
                 return 100
-            if "JBL" in desc_upper:
+            if "jbl" in t:
                 return 100
             # Accessories are lower value
-            if "CHARGER" in desc_upper or "CABLE" in desc_upper or "CASE" in desc_upper:
-                return 10
-            if "EARPODS" in desc_upper or "HANDSFREE" in desc_upper:
+            if "accessory" in t:
                 return 10
             # Default middle value
             return 50
         
         # Sort items by likely value
-        items_with_scores = [(item, product_value_score(item["desc"])) for item in items_with_desc]
+        items_with_scores = [
+            (item, product_value_score(desc_tags.get(item["sku"], frozenset())))
+            for item in items_with_desc
+        ]
         items_with_scores.sort(key=lambda x: x[1], reverse=True)
         
         # Assign prices to items (both sorted by value, so they match)
@@ -327,45 +1054,39 @@ def is_valid_cst(candidate: str) -> bool:
     return False
 
 
-def extract_cst(lines, full):
-    # Search line-by-line for valid CST candidates
-    for ln in lines:
-        parts = ln.split()
-        for token in parts:
-            if is_valid_cst(token):
-                return token
-
-    # fallback: full text token scan
-    for token in re.split(r"\s+", full):
+def extract_cst(lines):
+    # First valid CST token in document order; each distinct token is checked once
+    for token in line_index(lines).by_token:
         if is_valid_cst(token):
             return token
-
     return ""
 
 
-def extract_invoice(lines, full):
+def extract_invoice(lines):
     """Extract invoice number - handles both old and new formats"""
+    doc = line_index(lines)
     # Try old format first (with prefix text)
-    m = INVOICE_OLD_RE.search(full)
+    m = INVOICE_OLD_RE.search(doc.full)
     if m:
         return m.group(1)
     
     # Try new format (standalone line)
-    for line in lines:
-        m = INVOICE_NEW_RE.match(line.strip())
+    for line in doc.stripped:
+        m = INVOICE_NEW_RE.match(line)
         if m:
             return m.group(1)
     
     return ""
 
 
-def extract_serial(lines, full):
+def extract_serial(lines):
     """Extract serial number - handles both inline and separate line formats"""
+    doc = line_index(lines)
     # Find all serial numbers in the document
     serials = []
-    for line in lines:
-        if "Σειριακός" in line or "σειριακός" in line.lower():
-            m = SERIAL_RE.search(line.replace(" ", ""))
+    for line, line_tags in zip(doc.nospace, doc.tags):
+        if "serial_label" in line_tags:
+            m = SERIAL_RE.search(line)
             if m:
                 serials.append(m.group(1))
     
@@ -376,26 +1097,26 @@ def extract_serial(lines, full):
 def extract_name_phone_new_format(lines):
     """Extract name and phone from new format"""
     name, surname, phone = "", "", ""
+    doc = line_index(lines)
+    lines, tags = doc.lines, doc.tags
     
     # Look for ΕΠΩΝΥΜΙΑ: label (customer name in new format)
     # Name can appear in 1-3 lines after ΕΠΩΝΥΜΙΑ:, either as:
     # - Multiple single-word lines (e.g., "CHATZIGIAANNIS" / "KWNSTANTINOS")
     # - One multi-word line followed by more words (e.g., "VILLA CORONEL MIGUEL" / "ALEJANDRO")
-    for i, line in enumerate(lines):
-        if "ΕΠΩΝΥΜΙΑ:" in line:
-            # Collect potential name parts from next lines
+    for i in doc.by_tag.get("name_label", []):
+        # Collect potential name parts next to / under the label, then from next lines
+        for window in anchor_windows(i, 8, len(lines), doc.spatial):
             name_parts = []
-            for j in range(i + 1, min(i + 8, len(lines))):
-                candidate = lines[j].strip()
+            for j in window:
+                candidate = doc.stripped[j]
                 
                 # Stop at certain keywords/labels
-                if any(keyword in candidate for keyword in ["ΠΟΛΗ:", "Δ.Ο.Υ:", "ΤΗΛΕΦΩΝΟ:", "ΑΠΟΔΕΙΞΗ", "Ημερομηνία", "Σειρά", "Κωδικός Είδους"]):
+                if "name_stop" in tags[j]:
                     break
                 
                 # Skip obvious non-name lines
-                if "Είδος Παραστατικού" in candidate or "Παραστατικού" in candidate:
-                    continue
-                if "Δ.ΑΠΟΣΤΟΛΗΣ" in candidate or "ΛΙΑΝΙΚΗΣ" in candidate:
+                if "name_skip" in tags[j]:
                     continue
                 
                 # Check if it looks like a name part
@@ -406,36 +1127,34 @@ def extract_name_phone_new_format(lines):
                     # Stop after collecting 2 name segments (even if one has multiple words)
                     if len(name_parts) >= 2:
                         break
-            
-            # If we found name parts, assign them
-            if len(name_parts) >= 2:
-                # Last part is first name, rest is surname
-                name = name_parts[-1]
-                surname = " ".join(name_parts[:-1])
-                break
-            elif len(name_parts) == 1:
-                # Only one segment - try to split it
-                words = name_parts[0].split()
-                if len(words) >= 2:
-                    name = words[-1]
-                    surname = " ".join(words[:-1])
-                else:
-                    name = name_parts[0]
+            if name_parts:
                 break
+        
+        # If we found name parts, assign them
+        if len(name_parts) >= 2:
+            # Last part is first name, rest is surname
+            name = name_parts[-1]
+            surname = " ".join(name_parts[:-1])
+            break
+        elif len(name_parts) == 1:
+            # Only one segment - try to split it
+            words = name_parts[0].split()
+            if len(words) >= 2:
+                name = words[-1]
+                surname = " ".join(words[:-1])
+            else:
+                name = name_parts[0]
+            break
     
     # Look for phone - scan entire document for 8-digit phone pattern (with or without +)
     # First try the standard 8-digit Cyprus format
-    for line in lines:
-        m = PHONE8_RE.search(line.replace(" ", ""))
-        if m:
-            phone = m.group(1)
-            break
+    phone = next(filter(None, doc.phone8), "")
     
     # If no Cyprus phone found, look for international format (starts with +)
     if not phone:
-        for line in lines:
+        for line in doc.nospace:
             # Match international phone: + followed by 10-15 digits
-            m = re.search(r'\+(\d{10,15})', line.replace(" ", ""))
+            m = re.search(r'\+(\d{10,15})', line)
             if m:
                 phone = m.group(0)  # Keep the + prefix
                 break
@@ -446,59 +1165,378 @@ def extract_name_phone_new_format(lines):
 def extract_name_phone_old_format(lines):
     """Extract name and phone from old format"""
     name, surname, phone = "", "", ""
+    doc = line_index(lines)
+    lines, tags, index = doc.lines, doc.tags, doc.spatial
     
     # Find "Στοιχεία Πελάτη" anchor
-    anchor = next((i for i, s in enumerate(lines) if "Στοιχεία Πελάτη" in s), None)
+    anchor = doc.first_line_tagged("customer_anchor")
     
     if anchor is not None:
         # Look for name line
-        for i in range(anchor + 1, min(len(lines), anchor + 12)):
-            if looks_like_name(lines[i]):
-                name_line = lines[i]
-                parts = name_line.split()
-                if len(parts) >= 2:
-                    surname = " ".join(parts[:-1])
-                    name = parts[-1]
-                elif len(parts) == 1:
-                    name = parts[0]
-                break
+        name_line = next((lines[i] for window in anchor_windows(anchor, 12, len(lines), index)
+                          for i in window if looks_like_name(lines[i], tags[i])), None)
+        if name_line is not None:
+            parts = name_line.split()
+            if len(parts) >= 2:
+                surname = " ".join(parts[:-1])
+                name = parts[-1]
+            elif len(parts) == 1:
+                name = parts[0]
         
-        # Look for phone
-        for i in range(anchor, min(len(lines), anchor + 15)):
-            if "Τηλέφωνο:" in lines[i]:
-                m = PHONE8_RE.search(lines[i].replace(" ", ""))
-                if m:
-                    phone = m.group(1)
-                    break
+        # Look for phone on the label line, or in its own box right of the label
+        for window in anchor_windows(anchor, 15, len(lines), index):
+            for i in [anchor, *window]:
+                if "phone_label" in tags[i]:
+                    row = [i] + (index.right_of(i) if index is not None else [])
+                    phone = next(filter(None, (doc.phone8[j] for j in row)), "")
+                    if phone:
+                        break
+            if phone:
+                break
     
     return name, surname, phone
 
 
-def extract(pdf_path: str):
-    lines = get_lines(pdf_path)
-    full = "\n".join(lines)
+# ---------- invoice templates ----------
+# Templates are recognised from cheap signals in the first lines of the
+# document and dispatched to their own name/phone extractor. Only unknown
+# templates pay for the generic whole-document fallbacks.
+TEMPLATE_SCAN_LINES = 40
+UNKNOWN_TEMPLATE = "unknown"
 
-    # Detect format by checking for old format markers
-    is_old_format = any("Στοιχεία Πελάτη" in line for line in lines)
+
+def is_old_template(head, head_tags):
+    """Old layout: "Στοιχεία Πελάτη" block, "Αρ. παραστατικού:" label."""
+    return (any("customer_anchor" in t for t in head_tags)
+            or any(INVOICE_OLD_RE.search(s) for s in head))
+
+
+def is_new_template(head, head_tags):
+    """New layout: "ΕΠΩΝΥΜΙΑ:" label and a standalone ...ΑΠΔΑ... invoice line."""
+    return (any("name_label" in t for t in head_tags)
+            and any(INVOICE_NEW_RE.match(s.strip()) for s in head))
+
+
+def extract_old_template(doc):
+    """Old layout name/phone; the phone label can drift out of the anchor window."""
+    name, surname, phone = extract_name_phone_old_format(doc)
+    if not phone:
+        phone = next((p for p, t in zip(doc.phone8, doc.tags) if p and "phone_label" in t), "")
+    return name, surname, phone
+
+
+# name -> (fingerprint(head_lines, head_tags), name/phone extractor(LineIndex)); checked in order
+TEMPLATES = {
+    "old": (is_old_template, extract_old_template),
+    "new": (is_new_template, extract_name_phone_new_format),
+}
+
+
+def detect_template(doc):
+    """Name of the first template whose fingerprint matches, else UNKNOWN_TEMPLATE."""
+    head, head_tags = doc.lines[:TEMPLATE_SCAN_LINES], doc.tags[:TEMPLATE_SCAN_LINES]
+    for name, (fingerprint, _) in TEMPLATES.items():
+        if fingerprint(head, head_tags):
+            return name
+    return UNKNOWN_TEMPLATE
+
+
+# ---------- stage timings ----------
+# Opt-in (extract(..., timings=True)): wall time and tracemalloc peak per stage,
+# returned as a "_timings" sidecar and aggregated with TimingHistogram.
+# Disabled, the stages run under a shared nullcontext: no clocks, no tracing.
+TIMING_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+_NO_STAGE = nullcontext()
+
+
+def _no_stage(name):
+    return _NO_STAGE
+
+
+class StageTimer:
+    """
+    Per-stage wall time and allocation peak for one extract() call.
+    tracemalloc is process-wide, so peaks are only meaningful while a single
+    instrumented parse runs in the process (true for batch workers).
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self._started_tracing = not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+        self._t0 = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            ms = (time.perf_counter() - t0) * 1000
+            peak_kb = (tracemalloc.get_traced_memory()[1] - base) / 1024
+            stat = self.stages.setdefault(name, {"ms": 0.0, "peak_kb": 0.0, "calls": 0})
+            stat["ms"] += ms
+            stat["peak_kb"] = max(stat["peak_kb"], peak_kb)
+            stat["calls"] += 1
+
+    def timed(self, iterable, name):
+        """Yield from iterable, charging the time spent producing each item to `name`."""
+        it, done = iter(iterable), object()
+        while True:
+            with self.stage(name):
+                item = next(it, done)
+            if item is done:
+                return
+            yield item
+
+    def close(self):
+        """Stop tracing (if this timer started it) and return the _timings dict."""
+        total_ms = (time.perf_counter() - self._t0) * 1000
+        if self._started_tracing:
+            tracemalloc.stop()
+        out = {name: {"ms": round(st["ms"], 3), "peak_kb": round(st["peak_kb"], 1), "calls": st["calls"]}
+               for name, st in self.stages.items()}
+        out["total"] = {"ms": round(total_ms, 3)}
+        return out
+
+
+class TimingHistogram:
+    """Thread-safe per-stage histograms of _timings sidecars (bucket upper bounds in ms)."""
+
+    def __init__(self, buckets=TIMING_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def record(self, timings):
+        with self._lock:
+            for name, stat in timings.items():
+                h = self._stages.setdefault(name, {
+                    "count": 0, "sum_ms": 0.0, "max_ms": 0.0, "max_peak_kb": 0.0,
+                    "counts": [0] * (len(self.buckets) + 1),
+                })
+                ms = stat["ms"]
+                h["count"] += 1
+                h["sum_ms"] += ms
+                h["max_ms"] = max(h["max_ms"], ms)
+                h["max_peak_kb"] = max(h["max_peak_kb"], stat.get("peak_kb", 0.0))
+                h["counts"][bisect_left(self.buckets, ms)] += 1
+
+    def snapshot(self):
+        """JSON-ready {stage: {count, mean_ms, max_ms, max_peak_kb, buckets: {"<=N": n, ..., ">M": n}}}."""
+        labels = [f"<={b}" for b in self.buckets] + [f">{self.buckets[-1]}"]
+        with self._lock:
+            return {
+                name: {
+                    "count": h["count"],
+                    "mean_ms": round(h["sum_ms"] / h["count"], 3),
+                    "max_ms": round(h["max_ms"], 3),
+                    "max_peak_kb": round(h["max_peak_kb"], 1),
+                    "buckets": dict(zip(labels, h["counts"])),
+                }
+                for name, h in self._stages.items()
+            }
+
+
+def extract(pdf_path, early_stop: bool = False, backend=None, timings: bool = False, ocr: bool = True,
+            fields=None):
+    """
+    Parse an invoice PDF into the output fields.
+    pdf_path may also be the PDF's bytes or a binary file object (an upload
+    stream), so nothing has to touch the disk.
+
+    With early_stop=True pages are pulled one at a time and parsing stops as
+    soon as the end-of-table marker has been seen and every field is resolved,
+    so multi-page delivery notes usually cost a single page of layout analysis.
+
+    With timings=True the result also carries a "_timings" dict:
+    {stage: {"ms", "peak_kb", "calls"}, "total": {"ms"}}.
+
+    With ocr=True (and pytesseract / pdf2image installed) a document with
+    almost no text is re-read from an OCR of its first page.
+
+    fields (e.g. {"invoice", "serial"}) limits the result to those keys and
+    runs only the extractors they need; pages are pulled one at a time and
+    parsing stops as soon as they are all resolved, as with early_stop.
+    """
+    ocr = ocr if ocr and ocr_available() else False
+    if ocr and hasattr(pdf_path, "read"):
+        pdf_path = pdf_path.read()  # a stream can't be read twice
+    if fields is not None:
+        fields = frozenset(fields)
+        unknown = fields - set(FIELD_STAGES)
+        if unknown:
+            raise ValueError(f"Unknown field(s) {', '.join(sorted(unknown))} (choose from {', '.join(FIELD_STAGES)})")
+    if not timings:
+        return _extract(pdf_path, early_stop, backend, None, ocr, fields)
+    timer = StageTimer()
+    try:
+        result = _extract(pdf_path, early_stop, backend, timer, ocr, fields)
+    finally:
+        report = timer.close()
+    result["_timings"] = report
+    return result
+
+
+def _extract(pdf_path, early_stop, backend, timer, ocr=False, fields=None):
+    reading_order = fields is None or not fields <= ORDER_FREE_FIELDS
+    pages = iter_pages(pdf_path, backend, reading_order)
+    if timer is not None:
+        pages = timer.timed(pages, "get_lines")
+    if ocr:
+        pages = _with_ocr_fallback(pages, pdf_path, timer, defer=ocr == OCR_DEFERRED)
+    if not early_stop and fields is None:
+        return extract_fields([b for page_lines in pages for b in page_lines], timer)
+
+    # Items are judged over the whole table and the template over the first
+    # TEMPLATE_SCAN_LINES lines; every other field is final once it is found.
+    stages = field_stages(fields)
+    needs_table = "parse_items" in stages
+    needs_head = "template" in stages
+
+    lines = []
+    result = None
+    table_done = False
+    for page_lines in pages:
+        lines.extend(page_lines)
+        table_done = table_done or any(END_TABLE_RE.search(b.text) for b in page_lines)
+        if (table_done or not needs_table) and (table_done or not needs_head or len(lines) >= TEMPLATE_SCAN_LINES):
+            result = extract_fields(lines, timer, fields)
+            if all(result.values()):
+                return result
+            # A field is still empty (often for good: a quarter of the
+            # invoices carry no cst code). Re-running every extractor on each
+            # further page would be quadratic, so read the rest in one go.
+            break
+    rest = [b for page_lines in pages for b in page_lines]
+    if result is not None and not rest:
+        return result
+    return extract_fields(lines + rest, timer, fields)
+
+
+def _with_ocr_fallback(pages, pdf_path, timer, defer=False):
+    """Pass pages through; if they held fewer than OCR_MIN_LINES lines, add the OCR of page one."""
+    seen = 0
+    for page_lines in pages:
+        seen += len(page_lines)
+        yield page_lines
+    if seen < OCR_MIN_LINES:
+        if defer:
+            raise OcrDeferred()
+        stage = timer.stage if timer is not None else _no_stage
+        try:
+            with stage("ocr"):
+                lines = ocr_fallback.lines(read_pdf_bytes(pdf_path))
+        except MemoryError:
+            raise
+        except Exception as e:
+            # a broken Tesseract / poppler install must not fail the file
+            logger.warning(f"OCR failed, keeping the text layer: {type(e).__name__}: {e}")
+            return
+        yield lines
+
+
+# Output field -> the extractor stage that produces it, in output order
+FIELD_STAGES = {
+    "name": "name_phone",
+    "surname": "name_phone",
+    "phone": "name_phone",
+    "invoice": "extract_invoice",
+    "cst code": "extract_cst",
+    "material": "parse_items",
+    "product": "parse_items",
+    "serial": "extract_serial",
+    "template": "template",
+}
+# Fields that come out the same whatever order the text lines are in (a
+# document carries one invoice number), so layout can skip reading order
+ORDER_FREE_FIELDS = frozenset({"invoice"})
+# Stage -> stages whose results it reads
+STAGE_DEPENDENCIES = {
+    "name_phone": {"template"},
+    "parse_items": {"name_phone"},  # the customer phone is excluded from SKUs
+}
+
+
+def field_stages(fields=None):
+    """The extractor stages needed for `fields` (None: all of them), dependencies included."""
+    todo = list(FIELD_STAGES.values() if fields is None else (FIELD_STAGES[f] for f in fields))
+    stages = set()
+    while todo:
+        name = todo.pop()
+        if name not in stages:
+            stages.add(name)
+            todo.extend(STAGE_DEPENDENCIES.get(name, ()))
+    return stages
+
+
+def extract_fields(lines, timer=None, fields=None):
+    """
+    Run the extractors over the ordered text lines of one document.
+    lines are LineBox records (label lookups then go through a SpatialIndex)
+    or plain strings (reading order only). A StageTimer times each extractor.
+    With `fields`, only those keys are returned and only their stages run.
+    """
+    stage = timer.stage if timer is not None else _no_stage
+    stages = field_stages(fields)
+    doc = LineIndex(lines)
+    out = {}
+    if "template" in stages:
+        with stage("template"):
+            out["template"] = detect_template(doc)
     
     # Extract invoice number
-    invoice = extract_invoice(lines, full)
+    if "extract_invoice" in stages:
+        with stage("extract_invoice"):
+            out["invoice"] = extract_invoice(doc)
     
-    # Extract CST code
-    cst = extract_cst(lines, full)
+    if "extract_cst" in stages:
+        with stage("extract_cst"):
+            out["cst code"] = extract_cst(doc)
+
+    if "name_phone" in stages:
+        with stage("name_phone"):
+            if out["template"] != UNKNOWN_TEMPLATE:
+                # Known layout: the template's own name/phone extractor
+                out["name"], out["surname"], out["phone"] = TEMPLATES[out["template"]][1](doc)
+            else:
+                out["name"], out["surname"], out["phone"] = extract_generic(doc)
+
+    # Extract items → pick highest gross price (pass phone to avoid confusion)
+    if "parse_items" in stages:
+        with stage("parse_items"):
+            items = parse_items(doc, phone_to_exclude=out["phone"])
+        out["material"] = out["product"] = ""
+        if items:
+            best = max(items, key=lambda x: (x["gross"] or 0))
+            out["material"], out["product"] = best["sku"], best["desc"]
     
-    # Extract name and phone based on format (do this FIRST to get phone)
+    # Extract serial number
+    if "extract_serial" in stages:
+        with stage("extract_serial"):
+            out["serial"] = extract_serial(doc)
+
+    return {k: out[k] for k in FIELD_STAGES if fields is None or k in fields}
+
+
+def extract_generic(doc):
+    """Unknown template: format guess plus whole-document fallbacks. Returns (name, surname, phone)."""
+    # Detect format by checking for old format markers
+    is_old_format = any("customer_anchor" in t for t in doc.tags)
+    
+    # Extract name and phone based on format
     if is_old_format:
-        name, surname, phone = extract_name_phone_old_format(lines)
+        name, surname, phone = extract_name_phone_old_format(doc)
     else:
-        name, surname, phone = extract_name_phone_new_format(lines)
+        name, surname, phone = extract_name_phone_new_format(doc)
     
     # Fallback: try to find name anywhere if still empty
     if not name:
-        for s in lines:
-            if looks_like_name(s):
-                name_line = s
-                parts = name_line.split()
+        for s, line_tags, parts in zip(doc.lines, doc.tags, doc.tokens):
+            if looks_like_name(s, line_tags):
                 if len(parts) >= 2:
                     surname = " ".join(parts[:-1])
                     name = parts[-1]
@@ -509,37 +1547,487 @@ def extract(pdf_path: str):
     
     # Fallback: try to find phone anywhere if still empty
     if not phone:
-        for line in lines:
-            m = PHONE8_RE.search(line.replace(" ", ""))
-            if m:
-                phone = m.group(1)
-                break
+        phone = next(filter(None, doc.phone8), "")
 
-    # Extract items → pick highest gross price (pass phone to avoid confusion)
-    items = parse_items(lines, phone_to_exclude=phone)
-    material = product = ""
-    if items:
-        best = max(items, key=lambda x: (x["gross"] or 0))
-        material, product = best["sku"], best["desc"]
-    
-    # Extract serial number
-    serial = extract_serial(lines, full)
-
-    return {
-        "name": name,
-        "surname": surname,
-        "phone": phone,
-        "invoice": invoice,
-        "cst code": cst,
-        "material": material,
-        "product": product,
-        "serial": serial
+    return name, surname, phone
+
+
+# ---------- parse cache ----------
+def _source_version():
+    with open(os.path.abspath(__file__), "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+# Any edit to this module changes the version, which invalidates cached results.
+PARSER_VERSION = _source_version()
+
+
+class ParseCache:
+    """
+    Persistent, content-addressed cache of extract() results.
+
+    Entries are keyed by the SHA-256 of the PDF bytes, PARSER_VERSION and the
+    extract() options, and live in a SQLite file shared by all processes.
+    Once more than max_entries rows are stored the least recently used ones
+    are evicted.
+    """
+
+    def __init__(self, path, max_entries=5000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.reopen()
+
+    def reopen(self):
+        """(Re)connect to the cache file; call it in a forked child, SQLite connections must not cross fork()."""
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS parse_cache ("
+            " key TEXT PRIMARY KEY, fields TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS parse_cache_lru ON parse_cache (last_used)")
+        self._db.commit()
+
+    @staticmethod
+    def key_for(data: bytes, **options) -> str:
+        opts = ",".join(f"{k}={options[k]}" for k in sorted(options))
+        return f"{hashlib.sha256(data).hexdigest()}:{PARSER_VERSION}:{opts}"
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute("SELECT fields FROM parse_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._db.execute("UPDATE parse_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+        return json.loads(row[0])
+
+    def put(self, key, fields):
+        fields = {k: v for k, v in fields.items() if not k.startswith("_")}  # no per-run sidecars
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO parse_cache (key, fields, last_used) VALUES (?, ?, ?)",
+                (key, json.dumps(fields, ensure_ascii=False), time.time()),
+            )
+            (count,) = self._db.execute("SELECT COUNT(*) FROM parse_cache").fetchone()
+            if count > self.max_entries:
+                cur = self._db.execute(
+                    "DELETE FROM parse_cache WHERE key IN"
+                    " (SELECT key FROM parse_cache ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+                self.evictions += cur.rowcount
+            self._db.commit()
+
+    def key_for_pdf(self, data: bytes, **kwargs) -> str:
+        """Cache key for extract(data, **kwargs); timings do not change the fields."""
+        if kwargs.get("fields") is not None:
+            kwargs["fields"] = "+".join(sorted(kwargs["fields"]))  # sets have no stable repr
+        return self.key_for(data, backend=get_backend(kwargs.get("backend")).name,
+                            **{k: v for k, v in kwargs.items() if k not in ("backend", "timings")})
+
+    def extract(self, pdf_path, **kwargs):
+        """extract(pdf_path, **kwargs), served from the cache when the same bytes were parsed before."""
+        data = read_pdf_bytes(pdf_path)
+        key = self.key_for_pdf(data, **kwargs)
+        fields = self.get(key)
+        if fields is None:
+            fields = extract(data, **kwargs)
+            self.put(key, fields)
+        return fields
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM parse_cache")
+            self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            (entries,) = self._db.execute("SELECT COUNT(*) FROM parse_cache").fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": entries,
+            "parser_version": PARSER_VERSION,
+        }
+
+
+# ---------- batch parsing ----------
+# extract_many can run every file in a sandboxed worker process: a per-file CPU
+# budget (RLIMIT_CPU soft limit; SIGXCPU aborts the parse) and a cap on the
+# memory a worker may add on top of its size at start (RLIMIT_AS). Breaches
+# come back as PARSE_TIMED_OUT / PARSE_OUT_OF_MEMORY errors for that file only.
+PARSE_TIMED_OUT = "parse timed out"
+PARSE_OUT_OF_MEMORY = "parse exceeded memory limit"
+OCR_PENDING = "OCR pending"  # a parse worker handed the file to extract_many's OCR pool
+
+_sandbox_cpu_seconds = None  # set in sandboxed workers by _init_sandbox
+
+
+class ParseLimitExceeded(BaseException):
+    """CPU budget exhausted. A BaseException so pdfminer's own except-Exception blocks can't swallow it."""
+
+
+def _on_cpu_limit(signum, frame):
+    raise ParseLimitExceeded(PARSE_TIMED_OUT)
+
+
+def _address_space():
+    """Bytes currently mapped by this process (0 when /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+def _init_sandbox(cpu_seconds, memory_mb):
+    """Pool initializer: per-file CPU budget handler and the worker's address-space cap."""
+    global _sandbox_cpu_seconds
+    if resource is None:
+        return
+    if cpu_seconds:
+        _sandbox_cpu_seconds = cpu_seconds
+        signal.signal(signal.SIGXCPU, _on_cpu_limit)
+    if memory_mb:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        limit = _address_space() + memory_mb * 1024 * 1024
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+@contextmanager
+def _cpu_budget(seconds):
+    """Raise ParseLimitExceeded once this process has used `seconds` more CPU time."""
+    if not seconds or resource is None:
+        yield
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    old_soft, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = int(usage.ru_utime + usage.ru_stime + seconds) + 1
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+    try:
+        yield
+    finally:
+        resource.setrlimit(resource.RLIMIT_CPU, (old_soft, hard))
+
+
+def _extract_one(name, pdf_path, kwargs):
+    """Worker entry point: never raises, so one bad PDF only fails itself."""
+    try:
+        # workers are long-lived: parse with this process's warm backend
+        kwargs = dict(kwargs, backend=warm_backend(kwargs.get("backend")))
+        with _cpu_budget(_sandbox_cpu_seconds):
+            fields = extract(pdf_path, **kwargs)
+        return name, fields, None
+    except OcrDeferred:
+        return name, None, OCR_PENDING
+    except ParseLimitExceeded:
+        return name, None, f"{PARSE_TIMED_OUT} (over {_sandbox_cpu_seconds}s CPU)"
+    except MemoryError:
+        return name, None, PARSE_OUT_OF_MEMORY
+    except Exception as e:
+        return name, None, f"{type(e).__name__}: {e}"
+
+
+def _extract_isolated(name, pdf_path, kwargs, limits=(None, None)):
+    """Parse a single file in its own process (used after a worker crashed)."""
+    with ProcessPoolExecutor(max_workers=1, initializer=_init_sandbox, initargs=limits) as pool:
+        try:
+            return pool.submit(_extract_one, name, pdf_path, kwargs).result()
+        except BrokenProcessPool as e:
+            return name, None, f"worker crashed: {e}"
+
+
+def extract_many(paths, workers=None, cpu_seconds=None, memory_mb=None, max_files_per_worker=None, **kwargs):
+    """
+    Parse many PDFs in a process pool, yielding (path, fields, error) as each
+    file completes (completion order, not input order). Exactly one of
+    fields / error is None. kwargs are passed through to extract().
+
+    `paths` is an iterable of file paths, or a {name: pdf} mapping whose values
+    may also be bytes; the name is what comes back as the first tuple item.
+    The iterable is consumed lazily and only a few files per worker are in
+    flight at a time, so memory stays flat for arbitrarily long inputs.
+
+    Exceptions are caught per file. If a worker process dies outright (segfault,
+    OOM kill) the files it took down with it are re-parsed one per process, so
+    only the culprit is reported as failed.
+
+    Sandboxing (POSIX): cpu_seconds caps the CPU time of each file and
+    memory_mb the memory a worker may allocate; with either set, even a single
+    file is parsed out of process. max_files_per_worker recycles the pool after
+    about that many files per worker, which bounds pdfminer heap growth.
+
+    Scans (see OCR_MIN_LINES) are not OCRed by the parse workers: they hand
+    them back and the scans queue for a separate pool of OCR_WORKERS processes,
+    so a batch of scans never holds up the text PDFs behind it.
+    """
+    items = iter(paths.items()) if isinstance(paths, dict) else ((p, p) for p in paths)
+    workers = workers or os.cpu_count() or 1
+    if hasattr(paths, "__len__"):
+        workers = max(1, min(workers, len(paths)))
+    limits = (cpu_seconds, memory_mb)
+    if workers <= 1 and not any(limits):
+        for name, pdf in items:
+            yield _extract_one(name, pdf, kwargs)
+        return
+
+    def new_pool(size=workers):
+        return ProcessPoolExecutor(max_workers=size, initializer=_init_sandbox, initargs=limits)
+
+    parse_kwargs = dict(kwargs, ocr=OCR_DEFERRED) if kwargs.get("ocr", True) else kwargs
+    max_in_flight = workers * 2
+    pool_quota = workers * max_files_per_worker if max_files_per_worker else None
+    submitted = 0  # files handed to the current pool
+    pending = {}
+    pool = new_pool()
+    ocr_pending = {}
+    ocr_pool = None  # started on the first scan
+    try:
+        exhausted = False
+        while True:
+            while (not exhausted and len(pending) < max_in_flight
+                   and (pool_quota is None or submitted < pool_quota)):
+                item = next(items, None)
+                if item is None:
+                    exhausted = True
+                else:
+                    pending[pool.submit(_extract_one, item[0], item[1], parse_kwargs)] = item
+                    submitted += 1
+
+            if not pending:
+                if exhausted and not ocr_pending:
+                    break
+                if not exhausted:
+                    # this pool has done its share: recycle the worker processes
+                    pool.shutdown(wait=True)
+                    pool = new_pool()
+                    submitted = 0
+                    continue
+
+            done, _ = wait([*pending, *ocr_pending], return_when=FIRST_COMPLETED)
+            crashed, ocr_crashed = [], []
+            for fut in done:
+                if fut in ocr_pending:
+                    item = ocr_pending.pop(fut)
+                    try:
+                        yield fut.result()
+                    except BrokenProcessPool:
+                        ocr_crashed.append(item)
+                    continue
+                item = pending.pop(fut)
+                try:
+                    result = fut.result()
+                except BrokenProcessPool:
+                    crashed.append(item)
+                    continue
+                if result[2] != OCR_PENDING:
+                    yield result
+                    continue
+                if ocr_pool is None:
+                    ocr_pool = new_pool(OCR_WORKERS)
+                ocr_pending[ocr_pool.submit(_extract_one, item[0], item[1], kwargs)] = item
+
+            if crashed:
+                # Everything still in flight went down with the pool: start a
+                # fresh pool and re-parse the casualties one per process.
+                crashed.extend(pending.values())
+                pending.clear()
+                pool.shutdown(wait=True, cancel_futures=True)
+                pool = new_pool()
+                submitted = 0
+                for name, pdf in crashed:
+                    yield _extract_isolated(name, pdf, kwargs, limits)
+
+            if ocr_crashed:
+                # same for the OCR pool; the isolated re-runs OCR one at a time
+                ocr_crashed.extend(ocr_pending.values())
+                ocr_pending.clear()
+                ocr_pool.shutdown(wait=True, cancel_futures=True)
+                ocr_pool = None
+                for name, pdf in ocr_crashed:
+                    yield _extract_isolated(name, pdf, kwargs, limits)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        if ocr_pool is not None:
+            ocr_pool.shutdown(wait=True, cancel_futures=True)
+
+
+# ---------- bulk CLI ----------
+def iter_pdf_paths(inputs):
+    """Lazily expand files, directories (recursively, *.pdf) and glob patterns."""
+    for spec in inputs:
+        if os.path.isdir(spec):
+            for root, dirs, files in os.walk(spec):
+                dirs.sort()
+                for fname in sorted(files):
+                    if fname.lower().endswith(".pdf"):
+                        yield os.path.join(root, fname)
+        elif glob.has_magic(spec):
+            for path in glob.iglob(spec, recursive=True):
+                if os.path.isfile(path):
+                    yield path
+        else:
+            yield spec
+
+
+def load_done_paths(out_path):
+    """Paths already recorded in a JSONL output file (for --resume)."""
+    done = set()
+    if not os.path.exists(out_path):
+        return done
+    with open(out_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["path"])
+            except (ValueError, KeyError, TypeError):
+                continue  # partial last line from an interrupted run
+    return done
+
+
+def run_bulk(inputs, out_path, workers=None, resume=True, **kwargs):
+    """
+    Parse every PDF under `inputs` in worker processes and append one JSON line
+    per file ({"path", "fields", "error"}) to out_path as results arrive.
+    Returns a stats dict; throughput is printed to stderr.
+    """
+    done = load_done_paths(out_path) if resume else set()
+    skipped = 0
+
+    def todo():
+        nonlocal skipped
+        for path in iter_pdf_paths(inputs):
+            if path in done:
+                skipped += 1
+            else:
+                done.add(path)
+                yield path
+
+    mode = "a" if resume else "w"
+    if mode == "a" and os.path.exists(out_path) and os.path.getsize(out_path):
+        with open(out_path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b"\n"
+    else:
+        needs_newline = False
+
+    parsed = errors = 0
+    t0 = time.perf_counter()
+    with open(out_path, mode, encoding="utf-8") as out:
+        if needs_newline:
+            out.write("\n")
+        for path, fields, error in extract_many(todo(), workers=workers, **kwargs):
+            out.write(json.dumps({"path": path, "fields": fields, "error": error}, ensure_ascii=False) + "\n")
+            out.flush()
+            parsed += 1
+            errors += error is not None
+    elapsed = time.perf_counter() - t0
+
+    stats = {
+        "parsed": parsed,
+        "errors": errors,
+        "skipped": skipped,
+        "seconds": round(elapsed, 2),
+        "files_per_sec": round(parsed / elapsed, 2) if elapsed > 0 else 0.0,
     }
+    print(f"{parsed} files in {elapsed:.1f}s ({stats['files_per_sec']} files/s), "
+          f"{errors} errors, {skipped} skipped (already in {out_path})", file=sys.stderr)
+    return stats
+
+
+def check_backend_parity(paths, backends=None):
+    """
+    Parse every file with each backend and compare the field dicts.
+    Returns (mismatches, seconds_per_backend) where mismatches is a list of
+    (path, {field: {backend: value}}) for files whose fields differ.
+    """
+    backends = list(backends or BACKENDS)
+    seconds = {name: 0.0 for name in backends}
+    mismatches = []
+    for path in paths:
+        results = {}
+        for name in backends:
+            t0 = time.perf_counter()
+            try:
+                results[name] = extract(path, backend=name)
+            except Exception as e:
+                results[name] = {"error": f"{type(e).__name__}: {e}"}
+            seconds[name] += time.perf_counter() - t0
+        keys = sorted({k for fields in results.values() for k in fields})
+        diff = {
+            k: {name: results[name].get(k) for name in backends}
+            for k in keys
+            if len({results[name].get(k) for name in backends}) > 1
+        }
+        if diff:
+            mismatches.append((path, diff))
+    return mismatches, seconds
+
+
+def field_list(value):
+    """argparse type for --fields: comma-separated names out of FIELD_STAGES."""
+    fields = [f.strip() for f in value.split(",") if f.strip()]
+    unknown = [f for f in fields if f not in FIELD_STAGES]
+    if unknown or not fields:
+        problem = f"unknown field(s) {', '.join(unknown)}" if unknown else "no fields given"
+        raise argparse.ArgumentTypeError(f"{problem} (choose from {', '.join(FIELD_STAGES)})")
+    return fields
 
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python mini_invoice_fields_pdfminer.py /path/to/invoice.pdf")
-        sys.exit(1)
-    out = extract(sys.argv[1])
+    ap = argparse.ArgumentParser(description="Extract invoice fields from PDF files.")
+    ap.add_argument("pdfs", nargs="+", help="invoice PDF file(s); with --out also directories or globs")
+    ap.add_argument("--backend", choices=sorted(BACKENDS),
+                    help=f"text extraction backend (default: ${BACKEND_ENV} or {DEFAULT_BACKEND})")
+    ap.add_argument("--parity", action="store_true",
+                    help="parse the files with every backend and report field differences")
+    ap.add_argument("--out", metavar="FILE.jsonl",
+                    help="bulk mode: parse in parallel and append one JSON line per file")
+    ap.add_argument("--workers", type=int, default=None,
+                    help="bulk mode: worker processes (default: CPU count)")
+    ap.add_argument("--no-resume", action="store_true",
+                    help="bulk mode: overwrite --out instead of skipping paths already in it")
+    ap.add_argument("--timings", action="store_true",
+                    help="add per-stage wall time and allocation peaks as \"_timings\"")
+    ap.add_argument("--fields", type=field_list,
+                    help="only these comma-separated fields, e.g. invoice,serial (faster)")
+    ap.add_argument("--no-ocr", action="store_true",
+                    help="never OCR scanned PDFs (default: OCR the first page when there is no text)")
+    args = ap.parse_args()
+
+    if args.out:
+        run_bulk(args.pdfs, args.out, workers=args.workers, resume=not args.no_resume,
+                 backend=args.backend, timings=args.timings, ocr=not args.no_ocr, fields=args.fields)
+        sys.exit(0)
+
+    if args.parity:
+        mismatches, seconds = check_backend_parity(args.pdfs)
+        for path, diff in mismatches:
+            print(json.dumps({"path": path, "diff": diff}, ensure_ascii=False))
+        for name, secs in seconds.items():
+            print(f"{name}: {secs:.2f}s total, {secs / len(args.pdfs) * 1000:.1f} ms/file")
+        print(f"{len(args.pdfs) - len(mismatches)}/{len(args.pdfs)} files identical across backends")
+        sys.exit(1 if mismatches else 0)
+
+    if len(args.pdfs) == 1:
+        out = extract(args.pdfs[0], backend=args.backend, timings=args.timings, ocr=not args.no_ocr,
+                      fields=args.fields)
+    else:
+        backend = warm_backend(args.backend)
+        out = {path: extract(path, backend=backend, timings=args.timings, ocr=not args.no_ocr, fields=args.fields)
+               for path in args.pdfs}
     print(json.dumps(out, ensure_ascii=False, indent=2))
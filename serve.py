@@ -0,0 +1,133 @@
+# serve.py
+# Production entry point: serves a TICKETER*.py Flask app under gunicorn
+# instead of Werkzeug's development server (what `python TICKETER_IMPROVED.py`
+# runs).
+#
+#   python serve.py                     # TICKETER_IMPROVED on $HOST:$PORT
+#   python serve.py TICKETER --workers 4 --threads 16
+#
+# Layout:
+#   * the app is imported once in the master (preload), so pdfminer, Selenium
+#     and the parse cache are loaded before the workers fork
+#   * WEB_WORKERS processes x WEB_THREADS threads answer the fast routes
+#     (/parse_pdfs, /health, /jobs/<id>); each worker is recycled after
+#     WEB_MAX_REQUESTS requests (+ random jitter so they don't all restart together)
+#   * ticket automation runs in a separate job runner process (JOB_WORKERS
+#     Chrome batches at a time), fed by the web workers over a Unix socket, so
+#     a slow batch never holds a request thread and recycling a worker never
+#     kills a batch; the master forks a new runner if it dies (/health reports it)
+#   * job progress events go through SQLite (SHARED_JOB_EVENTS) so any worker
+#     can stream any job, and at most half the threads serve event streams
+
+import os, argparse, importlib
+
+from gunicorn.app.base import BaseApplication
+from gunicorn.workers.gthread import ThreadWorker
+
+WEB_WORKERS = int(os.environ.get("WEB_WORKERS", 2))
+WEB_THREADS = int(os.environ.get("WEB_THREADS", 8))
+WEB_MAX_REQUESTS = int(os.environ.get("WEB_MAX_REQUESTS", 1000))
+WEB_MAX_REQUESTS_JITTER = int(os.environ.get("WEB_MAX_REQUESTS_JITTER", 100))
+# Seconds a worker may stay silent before the master restarts it, and seconds
+# workers (and the job runner) get to finish their work on shutdown
+WEB_TIMEOUT = int(os.environ.get("WEB_TIMEOUT", 60))
+WEB_GRACEFUL_TIMEOUT = int(os.environ.get("WEB_GRACEFUL_TIMEOUT", 30))
+
+
+# RecyclingThreadWorker reaches into gthread's private internals (poller,
+# _lock, on_client_socket_readable, enqueue_req, TConn.initialized), which is
+# why requirements.txt pins gunicorn==23.0.0. test_serve.py recycles workers
+# under load and fails on any dropped request: run it before bumping gunicorn.
+class RecyclingThreadWorker(ThreadWorker):
+    """
+    gthread worker that recycles without dropping requests. The stock one
+    keeps accepting in its last poll and closes connections it accepted but
+    had not read yet unanswered. This one stops accepting once it is due
+    (another worker takes them from the listen queue) and hands connections
+    it already accepted to its threads, which it waits for before exiting.
+    """
+
+    def accept(self, server, listener):
+        if self.alive:
+            super().accept(server, listener)
+
+    def murder_keepalived(self):
+        super().murder_keepalived()
+        if self.alive:
+            return
+        with self._lock:
+            accepted = [key for key in self.poller.get_map().values()
+                        if key.data.func == self.on_client_socket_readable and not key.data.args[0].initialized]
+            for key in accepted:
+                self.poller.unregister(key.fileobj)
+        for key in accepted:
+            self.enqueue_req(key.data.args[0])
+
+
+class TicketerServer(BaseApplication):
+    """gunicorn application around an already imported (preloaded) Flask app"""
+
+    def __init__(self, module, options):
+        self.module = module
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return self.module.app
+
+
+def gunicorn_options(module, host, port, workers, threads, max_requests, jitter, timeout, graceful_timeout):
+    def post_fork(server, worker):
+        module.reopen_stores()
+
+    return {
+        "bind": f"{host}:{port}",
+        "worker_class": RecyclingThreadWorker,
+        "workers": workers,
+        "threads": threads,
+        "max_requests": max_requests,
+        "max_requests_jitter": jitter,
+        "timeout": timeout,
+        "graceful_timeout": graceful_timeout,
+        "preload_app": True,
+        "post_fork": post_fork,
+        "proc_name": module.__name__,
+    }
+
+
+def serve(module_name="TICKETER_IMPROVED", host="0.0.0.0", port=5000, workers=WEB_WORKERS, threads=WEB_THREADS,
+          max_requests=WEB_MAX_REQUESTS, jitter=WEB_MAX_REQUESTS_JITTER, timeout=WEB_TIMEOUT,
+          graceful_timeout=WEB_GRACEFUL_TIMEOUT):
+    # read by the app at import time
+    os.environ["SHARED_JOB_EVENTS"] = "true"
+    os.environ.setdefault("SSE_MAX_STREAMS", str(max(1, threads // 2)))
+    module = importlib.import_module(module_name)
+
+    master = os.getpid()
+    module.start_job_runner()
+    try:
+        TicketerServer(module, gunicorn_options(module, host, port, workers, threads, max_requests, jitter,
+                                                timeout, graceful_timeout)).run()
+    finally:
+        if os.getpid() == master:  # exiting workers unwind through here too
+            module.stop_job_runner(graceful_timeout)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Run TICKETER under gunicorn (production server).")
+    ap.add_argument("module", nargs="?", default="TICKETER_IMPROVED", choices=["TICKETER_IMPROVED", "TICKETER"],
+                    help="module holding the Flask app (default: TICKETER_IMPROVED)")
+    ap.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"), help="bind address (default: $HOST or 0.0.0.0)")
+    ap.add_argument("--port", type=int, default=int(os.environ.get("PORT", 5000)), help="port (default: $PORT or 5000)")
+    ap.add_argument("--workers", type=int, default=WEB_WORKERS, help=f"web worker processes (default: {WEB_WORKERS})")
+    ap.add_argument("--threads", type=int, default=WEB_THREADS, help=f"threads per worker (default: {WEB_THREADS})")
+    ap.add_argument("--max-requests", type=int, default=WEB_MAX_REQUESTS,
+                    help=f"recycle a worker after this many requests, 0: never (default: {WEB_MAX_REQUESTS})")
+    args = ap.parse_args()
+
+    serve(args.module, host=args.host, port=args.port, workers=args.workers, threads=args.threads,
+          max_requests=args.max_requests)
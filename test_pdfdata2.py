@@ -0,0 +1,184 @@
+# test_pdfdata2.py
+# Regression tests for pdfdata2 (python -m pytest test_pdfdata2.py).
+
+import time, random, argparse, multiprocessing
+from itertools import combinations
+
+import pytest
+
+import pdfdata2
+
+
+def brute_force_sums(cents):
+    """The pre-DP definition: values within 1.00 of a sum of 2..9 other (unequal) values."""
+    sums = set()
+    for target in cents:
+        others = [p for p in cents if p != target]
+        if any(abs(target - sum(combo)) < 100
+               for k in range(pdfdata2.SUM_MIN_TERMS, pdfdata2.SUM_MAX_TERMS + 1)
+               for combo in combinations(others, k)):
+            sums.add(target)
+    return sums
+
+
+def random_price_list(rng):
+    """10-15 prices in cents, a few of them (near) sums of others, as on invoices with subtotals."""
+    cents = [rng.randint(100, 150000) for _ in range(rng.randint(7, 12))]
+    while len(cents) < rng.randint(10, 15):
+        cents.append(sum(rng.sample(cents, rng.randint(2, 4))) + rng.randint(-99, 99))
+    rng.shuffle(cents)
+    return cents
+
+
+def test_find_sum_prices_matches_brute_force():
+    rng = random.Random(1)
+    for _ in range(200):
+        cents = random_price_list(rng)
+        assert pdfdata2.find_sum_prices(cents) == brute_force_sums(cents), cents
+
+
+def test_find_sum_prices_gap_of_exactly_one_euro_is_not_a_sum():
+    assert pdfdata2.find_sum_prices([1000, 2000, 3099]) == {3099}
+    assert pdfdata2.find_sum_prices([1000, 2000, 2901]) == {2901}
+    assert pdfdata2.find_sum_prices([1000, 2000, 3100]) == set()
+    assert pdfdata2.find_sum_prices([1000, 2000, 2900]) == set()
+
+
+def test_find_sum_prices_is_fast_on_long_lists():
+    rng = random.Random(2)
+    cents = [rng.randint(100, 1000000) for _ in range(80)]
+    started = time.perf_counter()
+    pdfdata2.find_sum_prices(cents)
+    assert time.perf_counter() - started < 2
+
+
+def long_statement(pages=20):
+    """A one-page invoice with no cst code followed by `pages` pages of terms text."""
+    fitz = pytest.importorskip("fitz")
+    import invoice_corpus
+
+    rng = random.Random(4)
+    doc = fitz.open()
+    canvas = invoice_corpus.Canvas(doc, fitz.Font("helv"))
+    items = invoice_corpus.random_items(random.Random(1))[:3]
+    invoice_corpus.draw_new(canvas, rng, "000123ΑΠΔΑ000456", ("ANNA", "PETROU"), "99123456", "", items)
+    for page in range(pages):
+        canvas.new_page()
+        for row in range(40):
+            canvas.row({invoice_corpus.LEFT: f"Terms and conditions, page {page + 2}, clause {row + 1}"})
+    canvas.flush()
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def test_early_stop_with_empty_field_extracts_at_most_twice(monkeypatch):
+    data = long_statement()
+    full = pdfdata2.extract(data, ocr=False)
+    assert full["cst code"] == ""
+
+    calls = []
+    extract_fields = pdfdata2.extract_fields
+    monkeypatch.setattr(pdfdata2, "extract_fields", lambda *a, **k: calls.append(1) or extract_fields(*a, **k))
+    assert pdfdata2.extract(data, early_stop=True, ocr=False) == full
+    assert len(calls) <= 2
+
+
+def blank_pdf(title=""):
+    fitz = pytest.importorskip("fitz")
+    doc = fitz.open()
+    doc.set_metadata({"title": title})
+    doc.new_page()
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def test_failed_ocr_keeps_the_text_layer_result(monkeypatch):
+    def broken(data):
+        raise RuntimeError("tesseract is not installed")
+
+    monkeypatch.setattr(pdfdata2, "ocr_available", lambda: True)
+    monkeypatch.setattr(pdfdata2.ocr_fallback, "lines", broken)
+    assert pdfdata2.extract(blank_pdf()) == pdfdata2.extract(blank_pdf(), ocr=False)
+
+
+def fake_recognize(data):
+    time.sleep(1)
+    return [pdfdata2.LineBox("Αρ. παραστατικού: 000001ΑΠΔΑ000002", 0, 40, 50, 300, 60)]
+
+
+def test_scans_queue_for_the_ocr_pool_without_holding_up_text_pdfs(monkeypatch):
+    pytest.importorskip("fitz")
+    import invoice_corpus
+
+    if multiprocessing.get_start_method() != "fork":
+        pytest.skip("the OCR stub reaches the pool workers through fork()")
+    monkeypatch.setattr(pdfdata2, "ocr_available", lambda: True)
+    monkeypatch.setattr(pdfdata2.ocr_fallback, "_recognize", fake_recognize)
+    monkeypatch.setattr(pdfdata2, "OCR_WORKERS", 1)
+    pdfs = {f"scan{i}": blank_pdf(f"scan {i}") for i in range(3)}
+    pdfs.update({f"text{i}": invoice_corpus.make_invoice(random.Random(i))[0] for i in range(6)})
+
+    order = []
+    for name, fields, error in pdfdata2.extract_many(pdfs, workers=2):
+        assert error is None, (name, error)
+        order.append(name)
+        if name.startswith("scan"):
+            assert fields["invoice"] == "000001ΑΠΔΑ000002"
+    # one OCR at a time, and the scans queued for it never block a parse worker
+    assert sorted(order[:6]) == [f"text{i}" for i in range(6)]
+    assert len(order) == 9
+
+
+def test_fields_option_rejects_unknown_names():
+    assert pdfdata2.field_list("invoice, cst code") == ["invoice", "cst code"]
+    with pytest.raises(argparse.ArgumentTypeError, match="invoce"):
+        pdfdata2.field_list("invoce,serial")
+
+
+def text_pdf(widths):
+    """One page, two text runs on a row, in a non-embedded TrueType font with the given Widths."""
+    content = b"BT /F1 20 Tf 50 700 Td (INVOICE 12345) Tj ET BT /F1 20 Tf 330 700 Td (TOTAL RIGHT) Tj ET"
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 4 0 R >> >>"
+        b" /Contents 6 0 R >>",
+        b"<< /Type /Font /Subtype /TrueType /BaseFont /InvoiceSans /FirstChar 32 /LastChar 126"
+        b" /Widths [" + b" ".join(b"%d" % w for w in widths) + b"] /FontDescriptor 5 0 R >>",
+        b"<< /Type /FontDescriptor /FontName /InvoiceSans /Flags 32 /FontBBox [0 -200 1000 900]"
+        b" /ItalicAngle 0 /Ascent 900 /Descent -200 /CapHeight 700 /StemV 80 >>",
+        b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def test_font_cache_keeps_documents_with_different_widths_apart():
+    wide, narrow = text_pdf([1000] * 95), text_pdf([400] * 95)
+
+    def lines(backend, pdf):
+        return [(b.text, round(b.x0), round(b.x1)) for page in backend.iter_pages(pdf) for b in page]
+
+    cold = lines(pdfdata2.PdfminerBackend(), narrow)
+    assert [text for text, _, _ in cold] == ["INVOICE 12345", "TOTAL RIGHT"]
+
+    warm = pdfdata2.PdfminerBackend(pdfdata2.PdfminerContext())
+    lines(warm, wide)  # caches /InvoiceSans with the wide metrics
+    assert lines(warm, narrow) == cold
+
+
+def test_line_index_finds_labels_by_tag():
+    doc = pdfdata2.LineIndex(["Τιμολόγιο", "Στοιχεία Πελάτη", "ΕΠΩΝΥΜΙΑ:", "PETROU", "ΕΠΩΝΥΜΙΑ:"])
+    assert doc.first_line_tagged("customer_anchor") == 1
+    assert doc.by_tag["name_label"] == [2, 4]
+    assert doc.first_line_tagged("table_header") is None
@@ -0,0 +1,93 @@
+# test_serve.py
+# Smoke tests for serve.py (python -m pytest test_serve.py): boot the app under
+# gunicorn and check that workers recycle without dropping requests and that a
+# job runner that died is replaced.
+
+import os, re, sys, json, time, signal, socket, tempfile, subprocess, urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("gunicorn")
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+STARTUP_TIMEOUT = 120
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def server():
+    """serve.py with 2 workers recycled every 5 requests; yields (base_url, log_path)"""
+    port = free_port()
+    with tempfile.TemporaryDirectory() as workdir:
+        log_path = os.path.join(workdir, "server.out")
+        with open(log_path, "wb") as log:
+            proc = subprocess.Popen(
+                [sys.executable, os.path.join(HERE, "serve.py"), "--host", "127.0.0.1", "--port", str(port),
+                 "--workers", "2", "--threads", "2", "--max-requests", "5"],
+                cwd=workdir, env=dict(os.environ, WEB_MAX_REQUESTS_JITTER="0"), stdout=log, stderr=subprocess.STDOUT)
+        base = f"http://127.0.0.1:{port}"
+        try:
+            deadline = time.time() + STARTUP_TIMEOUT
+            while True:
+                assert proc.poll() is None, f"serve.py exited with {proc.returncode}"
+                try:
+                    urllib.request.urlopen(base + "/health", timeout=2).read()
+                    break
+                except OSError:
+                    assert time.time() < deadline, "serve.py did not come up"
+                    time.sleep(0.5)
+            yield base, log_path
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(60)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+
+
+def test_workers_recycle_without_dropping_requests(server):
+    base, log_path = server
+
+    def get(_):
+        try:
+            with urllib.request.urlopen(base + "/health", timeout=30) as resp:
+                return resp.status
+        except OSError as e:
+            return repr(e)
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        statuses = list(pool.map(get, range(120)))
+
+    assert [s for s in statuses if s != 200] == []
+    with open(log_path, encoding="utf-8", errors="replace") as f:
+        log = f.read()
+    # 2 workers at boot, then one more per recycle
+    assert log.count("Booting worker") >= 10, log[-2000:]
+
+
+def test_dead_job_runner_is_replaced(server):
+    base, log_path = server
+
+    def runner_pids():
+        with open(log_path, encoding="utf-8", errors="replace") as f:
+            return [int(pid) for pid in re.findall(r"Job runner started \(pid (\d+)", f.read())]
+
+    def health():
+        with urllib.request.urlopen(base + "/health", timeout=30) as resp:
+            return json.load(resp)
+
+    assert health()["job_runner"] == "running"
+    (pid,) = runner_pids()
+    os.kill(pid, signal.SIGKILL)
+    deadline = time.time() + 30
+    while len(runner_pids()) < 2 or health()["job_runner"] != "running":
+        assert time.time() < deadline, "job runner was not restarted"
+        time.sleep(0.5)
+    assert health()["status"] == "healthy"